@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Import-time benchmark of `composed_trackers`.
+
+Fails (exit code 1) if `import composed_trackers` pulls in heavy dependencies
+or takes longer than the budget.
+
+usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget 0.5 --repeat 10
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ['torch', 'neptune', 'pandas', 'numpy', 'mmcv', 'IPython', 'matplotlib']
+
+CODE = """
+import json, sys, time
+t0 = time.perf_counter()
+import composed_trackers
+t = time.perf_counter() - t0
+print(json.dumps({'time': t, 'modules': [m for m in %r if m in sys.modules]}))
+""" % HEAVY_MODULES
+
+
+def measure():
+    # new interpreter for every measurement: nothing is imported yet
+    out = subprocess.check_output([sys.executable, '-c', CODE])
+    return json.loads(out.decode().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget', type=float, default=0.5, help='max seconds for import (median)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = [measure() for _ in range(args.repeat)]
+    times = sorted([r['time'] for r in results])
+    median = times[len(times) // 2]
+    modules = sorted(set([m for r in results for m in r['modules']]))
+
+    print(f'import composed_trackers: median {median:.3f}s, min {times[0]:.3f}s, max {times[-1]:.3f}s')
+
+    ok = True
+    if modules:
+        print('Heavy modules are imported:', ', '.join(modules))
+        ok = False
+    if median > args.budget:
+        print(f'Import takes more than {args.budget}s')
+        ok = False
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,18 @@
 ""
 from . import trackers
 from .composer import ComposedTrackers, TRACKERS
+from .reducers import REDUCERS
+from .server import TrackerServer, TrackerClient
+from .catalog import Catalog
+from .blobs import BlobStore
+from .run import Run, iter_aligned
+from .journal import binary_to_json, binary_to_csv
 from .utils.utils import is_notebook
 from .utils.config import Config, get_shell_args, load_config_with_shell_updates
 from .utils.registry import build_from_cfg
 from .version import __version__
 
-__all__ = ['__version__', 'trackers', 'ComposedTrackers', 'TRACKERS', 'is_notebook',
+__all__ = ['__version__', 'trackers', 'ComposedTrackers', 'TRACKERS', 'REDUCERS', 'TrackerServer', 'TrackerClient', 'is_notebook',
+           'Catalog', 'BlobStore', 'Run', 'iter_aligned', 'binary_to_json', 'binary_to_csv',
            'Config', 'get_shell_args', 'load_config_with_shell_updates', 'build_from_cfg',
            ]
@@ -0,0 +1,107 @@
+import os
+import stat
+import uuid
+import hashlib
+from pathlib import Path
+
+from .utils.fileio import ingest_file, atomic_open
+
+
+def hash_file(fn, chunk_size=1 << 20):
+    """sha256 of a file, read by chunks of `chunk_size` bytes."""
+    h = hashlib.sha256()
+    with open(fn, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BlobStore(object):
+    """
+    Content-addressed storage of artifacts in `root_path/.blobs`: a file per unique content,
+    named by its sha256. Artifacts of runs are hard links to blobs, so an artifact logged
+    by many runs is stored (and copied) once.
+
+    Blobs are read-only, artifacts must not be modified in place. A blob is garbage
+    when no artifact links to it (e.g. runs were removed), `gc` removes such blobs.
+
+    Example
+    -------
+        blobs = BlobStore('./logbook')
+        blobs.store('configs/model.yaml', run_path / 'artifacts/model.yaml')
+        blobs.gc()
+    """
+
+    def __init__(self, root_path, dirname='.blobs'):
+        self.root_path = Path(root_path)
+        self.directory = self.root_path / dirname
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.directory})'
+
+    def blob_path(self, digest):
+        return self.directory / digest[:2] / digest[2:]
+
+    def add(self, src, strategy='copy'):
+        """
+        Add a file to the store, returns its digest. The file is not copied if the content is stored already.
+
+        strategy : str
+            how a new content is put to the store, see `ingest_file`. 'hardlink' is replaced by 'copy':
+            the blob must not share the file with `src`, which can be changed.
+        """
+        digest = hash_file(src)
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            os.makedirs(blob.parent, exist_ok=True)
+            ingest_file(src, blob, 'copy' if strategy == 'hardlink' else strategy)
+            os.chmod(blob, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        elif strategy == 'move':
+            os.remove(src)
+        return digest
+
+    def add_bytes(self, data):
+        """Add bytes to the store, returns the digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            os.makedirs(blob.parent, exist_ok=True)
+            with atomic_open(blob, 'wb') as f:
+                f.write(data)
+            os.chmod(blob, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        return digest
+
+    def link(self, digest, dst):
+        """Create (replace) `dst` as a hard link to the blob."""
+        dst = Path(dst)
+        tmp = dst.parent / f'.{dst.name}.{uuid.uuid4().hex[:8]}.tmp'
+        os.link(self.blob_path(digest), tmp)
+        os.replace(tmp, dst)
+
+    def store(self, src, dst, strategy='copy'):
+        """Add `src` to the store and link it as `dst`, returns the digest."""
+        digest = self.add(src, strategy)
+        self.link(digest, dst)
+        return digest
+
+    def blobs(self):
+        if not self.directory.is_dir():
+            return []
+        return [fn for fn in self.directory.glob('??/*') if not fn.name.endswith('.tmp')]
+
+    def gc(self, dry_run=False, verbose=False):
+        """
+        Remove blobs without artifacts linked to them, returns (number of blobs, bytes) removed.
+        """
+        n, size = 0, 0
+        for blob in self.blobs():
+            st = os.stat(blob)
+            if st.st_nlink > 1:
+                continue
+            n += 1
+            size += st.st_size
+            if not dry_run:
+                os.remove(blob)
+        if verbose:
+            print(f'{self}: {n} blobs ({size} bytes) {"to remove" if dry_run else "removed"}.')
+        return n, size
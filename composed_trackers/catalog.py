@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import sqlite3
+import warnings
+import contextlib
+from pathlib import Path
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    exp_id TEXT PRIMARY KEY, path TEXT, name TEXT, description TEXT, status TEXT, created REAL, updated REAL);
+CREATE TABLE IF NOT EXISTS params (
+    exp_id TEXT, key TEXT, value, PRIMARY KEY (exp_id, key));
+CREATE TABLE IF NOT EXISTS properties (
+    exp_id TEXT, key TEXT, value, PRIMARY KEY (exp_id, key));
+CREATE TABLE IF NOT EXISTS tags (
+    exp_id TEXT, tag TEXT, PRIMARY KEY (exp_id, tag));
+CREATE TABLE IF NOT EXISTS channels (
+    exp_id TEXT, name TEXT, count INTEGER, first REAL, last REAL, min REAL, max REAL, mean REAL,
+    PRIMARY KEY (exp_id, name));
+CREATE INDEX IF NOT EXISTS params_key_value ON params (key, value);
+CREATE INDEX IF NOT EXISTS properties_key_value ON properties (key, value);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+CREATE INDEX IF NOT EXISTS channels_name ON channels (name);
+"""
+
+OPERATORS = ['=', '!=', '<', '<=', '>', '>=', 'LIKE']
+STATS = ['count', 'first', 'last', 'min', 'max', 'mean']
+
+
+def flatten(d, prefix='', sep='.'):
+    """Flatten nested dictionaries: {'a': {'b': 1}} -> {'a.b': 1}."""
+    items = {}
+    for key, value in d.items():
+        key = prefix + str(key)
+        if isinstance(value, dict):
+            items.update(flatten(value, key + sep, sep))
+        else:
+            items[key] = value
+    return items
+
+
+def to_sql_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    try:
+        return json.dumps(value)
+    except Exception:
+        return str(value)
+
+
+def channel_summary(values):
+    """Summary statistics of numeric values of a channel."""
+    n = len(values)
+    if n == 0:
+        return dict(count=0, first=None, last=None, min=None, max=None, mean=None)
+    return dict(count=n, first=values[0], last=values[-1], min=min(values), max=max(values), mean=sum(values) / n)
+
+
+class Catalog(object):
+    """
+    Index of experiments of a SimpleTracker logbook in SQLite database `root_path/catalog.sqlite`.
+
+    It keeps flatten params, tags, properties and summary statistics of channels of each run,
+    so runs can be found without reading files of every experiment.
+
+    Example
+    -------
+        catalog = Catalog('./logbook')
+        catalog.rebuild()       # index runs logged without catalog
+        runs = catalog.find(tags=['baseline'],
+                            params={'optimizer.lr': ('<', 0.01)},
+                            metrics={'val_loss': ('min', '<', 0.3)})
+        [run['exp_id'] for run in runs]
+    """
+
+    def __init__(self, root_path, filename='catalog.sqlite', timeout=30):
+        self.root_path = Path(root_path)
+        self.filename = self.root_path / filename
+        self.timeout = timeout
+
+        os.makedirs(self.root_path, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.filename})'
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # a connection per operation: the catalog is shared by processes and threads
+        conn = sqlite3.connect(str(self.filename), timeout=self.timeout)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add_run(self, exp_id, path=None, name=None, description=None, params={}, properties={}, tags=[], status='running'):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (exp_id, str(path), name, description, status, now, now))
+            for table in ['params', 'properties', 'tags', 'channels']:
+                conn.execute(f'DELETE FROM {table} WHERE exp_id = ?', (exp_id,))
+            self._set_items(conn, 'params', exp_id, params)
+            self._set_items(conn, 'properties', exp_id, properties)
+            conn.executemany('INSERT OR IGNORE INTO tags VALUES (?, ?)', [(exp_id, tag) for tag in tags])
+
+    def _set_items(self, conn, table, exp_id, d):
+        rows = [(exp_id, key, to_sql_value(value)) for key, value in flatten(d).items()]
+        conn.executemany(f'INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)', rows)
+
+    def _touch(self, conn, exp_id, status=None):
+        if status is None:
+            conn.execute('UPDATE runs SET updated = ? WHERE exp_id = ?', (time.time(), exp_id))
+        else:
+            conn.execute('UPDATE runs SET updated = ?, status = ? WHERE exp_id = ?', (time.time(), status, exp_id))
+
+    def set_properties(self, exp_id, properties):
+        with self._connect() as conn:
+            self._set_items(conn, 'properties', exp_id, properties)
+            self._touch(conn, exp_id)
+
+    def add_tags(self, exp_id, tags):
+        with self._connect() as conn:
+            conn.executemany('INSERT OR IGNORE INTO tags VALUES (?, ?)', [(exp_id, tag) for tag in tags])
+            self._touch(conn, exp_id)
+
+    def set_channels(self, exp_id, summaries, status=None):
+        """
+        summaries : dict
+            name -> dict(count, first, last, min, max, mean), see `channel_summary`
+        """
+        rows = [(exp_id, name) + tuple([s[key] for key in STATS]) for name, s in summaries.items()]
+        with self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO channels VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self._touch(conn, exp_id, status)
+
+    def find(self, tags=None, params=None, properties=None, metrics=None, status=None, name=None):
+        """
+        Find runs, conditions are combined with AND.
+
+        tags : list of str
+            runs with all these tags
+        params, properties : dict
+            key -> value or (operator, value), e.g. {'optimizer.lr': ('<', 0.01), 'model': 'resnet'}
+        metrics : dict
+            channel name -> (statistic, operator, value), e.g. {'val_loss': ('min', '<', 0.3)},
+            statistic is one of 'count', 'first', 'last', 'min', 'max', 'mean'
+        status : str
+            'running' or 'stopped'
+        name : str
+            SQL LIKE pattern of name of the run
+
+        Returns list of dictionaries (rows of runs).
+        """
+        conditions = []
+        args = []
+
+        for tag in (tags or []):
+            conditions.append('exp_id IN (SELECT exp_id FROM tags WHERE tag = ?)')
+            args.append(tag)
+
+        for table, d in [('params', params), ('properties', properties)]:
+            for key, condition in (d or {}).items():
+                op, value = condition if isinstance(condition, tuple) else ('=', condition)
+                assert op in OPERATORS, f'Operator must be one of {OPERATORS}'
+                conditions.append(f'exp_id IN (SELECT exp_id FROM {table} WHERE key = ? AND value {op} ?)')
+                args += [key, to_sql_value(value)]
+
+        for channel, (stat, op, value) in (metrics or {}).items():
+            assert stat in STATS, f'Statistic must be one of {STATS}'
+            assert op in OPERATORS, f'Operator must be one of {OPERATORS}'
+            conditions.append(f'exp_id IN (SELECT exp_id FROM channels WHERE name = ? AND {stat} {op} ?)')
+            args += [channel, value]
+
+        if status is not None:
+            conditions.append('status = ?')
+            args.append(status)
+        if name is not None:
+            conditions.append('name LIKE ?')
+            args.append(name)
+
+        sql = 'SELECT * FROM runs'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY created'
+
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(sql, args)]
+
+    def get(self, exp_id):
+        """All indexed information about the run or None."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM runs WHERE exp_id = ?', (exp_id,)).fetchone()
+            if row is None:
+                return None
+            run = dict(row)
+            for table in ['params', 'properties']:
+                run[table] = dict([(r['key'], r['value']) for r in conn.execute(f'SELECT key, value FROM {table} WHERE exp_id = ?', (exp_id,))])
+            run['tags'] = [r['tag'] for r in conn.execute('SELECT tag FROM tags WHERE exp_id = ?', (exp_id,))]
+            run['channels'] = dict([(r['name'], dict([(key, r[key]) for key in STATS]))
+                                    for r in conn.execute('SELECT * FROM channels WHERE exp_id = ?', (exp_id,))])
+        return run
+
+    def remove(self, exp_id):
+        with self._connect() as conn:
+            for table in ['runs', 'params', 'properties', 'tags', 'channels']:
+                conn.execute(f'DELETE FROM {table} WHERE exp_id = ?', (exp_id,))
+
+    def rebuild(self, verbose=False):
+        """
+        Index all experiments found in `root_path` (e.g. logged without the catalog).
+        """
+        from mmcv.fileio.io import load
+
+        n = 0
+        for path in sorted(self.root_path.iterdir()):
+            if not (path / 'params.yaml').exists():
+                continue
+            try:
+                def load_or(fn, default):
+                    fn = path / fn
+                    return load(str(fn)) if fn.exists() else default
+
+                self.add_run(path.name, path,
+                             params=load_or('params.yaml', {}) or {},
+                             properties=load_or('properties.yaml', {}) or {},
+                             tags=load_or('tags.yaml', []) or [],
+                             status='stopped')
+                metrics = load_or('metrics.json', {})
+                summaries = dict([(name, channel_summary([p['value'] for p in points])) for name, points in metrics.items()])
+                self.set_channels(path.name, summaries)
+                n += 1
+            except Exception as e:
+                warnings.warn(f"Can't index {path}: {e}", UserWarning)
+        if verbose:
+            print(f'{self}: {n} runs indexed.')
+        return n
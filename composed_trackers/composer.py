@@ -1,24 +1,39 @@
 import os
-import warnings
+import time
+import uuid
 import tempfile
+import warnings
 import traceback
-from torch import is_tensor
-
+import contextlib
 
 from .utils.registry import Registry, build_from_cfg
 from .trackers.simple import SimpleTracker
-from .trackers.neptune import NeptuneTracker
 from .trackers.base import BaseTracker
+from .dispatch import TrackerWorker, CircuitBreaker, Countdown, call_tracker
+from .server import TrackerClient
 
 from .utils.log import print_color
+from .utils.tensors import is_tensor, is_scalar_tensor, tensors_to_floats
+from .reducers import ChannelReducers
 
 TRACKERS = Registry('Trackers')
 TRACKERS.register_module(SimpleTracker)
-TRACKERS.register_module(NeptuneTracker)
+TRACKERS.register_module(TrackerClient)
+TRACKERS.register_lazy_module('NeptuneTracker', 'composed_trackers.trackers.neptune')
 
 
 class ComposedTrackers(BaseTracker):
-    def __init__(self, name='name', description='Composed trackers', tags=[], params={}, offline=False, initialize_fn=None, **cfg):
+    def __init__(self, name='name', description='Composed trackers', tags=[], params={}, offline=False, initialize_fn=None,
+                 async_dispatch=False,          # Call trackers in background threads, one thread and queue per tracker
+                 queue_size=1000,               # Size of queue of each tracker when async_dispatch
+                 queue_full_policy='block',     # 'block', 'drop_oldest' or 'drop_newest'
+                 stop_timeout=None,             # Max seconds to wait for each queue on .stop()
+                 defer_tensors=False,           # Keep tensor values of metrics until .flush(), then copy them to cpu at once
+                 defer_tensors_steps=100,       # .flush() automatically after N calls with deferred tensors
+                 downsample={},                 # Reducers of channels by glob patterns of names, see ChannelReducers
+                 rate_limits={},                # Rate limits of channels by glob patterns of names, see RateLimit
+                 circuit_breaker=None,          # Skip calls of a failing tracker, arguments of CircuitBreaker, e.g. {'max_failures': 5}
+                 **cfg):
         self.name = name
         self.description = description
         self.tags = tags
@@ -26,14 +41,39 @@ class ComposedTrackers(BaseTracker):
 
         self.offline = offline
 
+        self.async_dispatch = async_dispatch
+        self.queue_size = queue_size
+        self.queue_full_policy = queue_full_policy
+        self.stop_timeout = stop_timeout
+        self.defer_tensors = defer_tensors
+        self.defer_tensors_steps = defer_tensors_steps
+        self.downsample = downsample
+        self.rate_limits = rate_limits
+        self.circuit_breaker = circuit_breaker
+
         self.cfg = cfg
 
         self._initialize_fn = initialize_fn
+        self._workers = None
+        self._breakers = None           # CircuitBreaker per tracker
+        self._deferred_metrics = []     # (metrics, index, timestamp, autoincrement_index)
+        # stages of reduction of points: downsampling, then rate limits
+        self._reducers = []
+        if downsample:
+            self._reducers.append(ChannelReducers(downsample))
+        if rate_limits:
+            self._reducers.append(ChannelReducers(rate_limits, default_type='RateLimit'))
 
         self.initialize()
 
     def initialize(self):
         self.initialize_fn()
+        self._breakers = [None] * len(self.trackers)
+        if self.circuit_breaker is not None:
+            self._breakers = [CircuitBreaker(**self.circuit_breaker) for _ in self.trackers]
+        if self.async_dispatch:
+            self._workers = [TrackerWorker(tracker, self.queue_size, self.queue_full_policy, breaker)
+                             for tracker, breaker in zip(self.trackers, self._breakers)]
 
     def initialize_fn(self):
         if self._initialize_fn is not None:
@@ -84,89 +124,305 @@ class ComposedTrackers(BaseTracker):
                 print_color(f'{tracker.exp_id}', 'green')
         print()
 
+    def _dispatch(self, method, *args, print_traceback=False, on_done=None, droppable=False, exclude=(), force=False, **kwargs):
+        """
+        Call `method` of every tracker, directly or through the queues of background workers.
+
+        on_done : callable
+            Called once per tracker after the call is executed.
+        droppable : bool
+            The call may be discarded by a worker with the full queue, see `queue_full_policy`.
+        exclude : list
+            Trackers to skip.
+        force : bool
+            Call trackers even if their circuits are open, see `circuit_breaker`.
+        """
+        if self._workers is not None:
+            for worker in self._workers:
+                if any([worker.tracker is tracker for tracker in exclude]):
+                    continue
+                worker.submit(method, *args, print_traceback=print_traceback, on_done=on_done, droppable=droppable,
+                              force=force, **kwargs)
+            return
+
+        for tracker, breaker in zip(self.trackers, self._breakers):
+            if any([t is tracker for t in exclude]):
+                continue
+            call_tracker(tracker, method, args, kwargs, print_traceback, breaker, force)
+            if on_done is not None:
+                on_done()
+
+    def join(self, trackers=None):
+        """
+        Wait until all queued calls are executed by trackers (async_dispatch only).
+
+        trackers : list
+            Wait for these trackers only.
+        """
+        if self._workers is not None:
+            for worker in self._workers:
+                if trackers is None or any([worker.tracker is tracker for tracker in trackers]):
+                    worker.join()
+
+    def flush(self):
+        """
+        Log deferred metrics and write pending data of trackers (e.g. snapshots of SimpleTracker).
+        """
+        self._flush_deferred()
+        self._dispatch('flush')
+
+    def _flush_deferred(self):
+        """
+        Log deferred metrics.
+
+        Scalar tensors of all deferred metrics are copied to cpu with one transfer per device.
+        """
+        deferred = self._deferred_metrics
+        if len(deferred) == 0:
+            return
+        self._deferred_metrics = []
+
+        try:
+            tensors = [(metrics, key, val) for metrics, _, _, _ in deferred for key, val in metrics.items() if is_scalar_tensor(val)]
+            floats = tensors_to_floats([val for _, _, val in tensors])
+            for (metrics, key, _), value in zip(tensors, floats):
+                metrics[key] = value
+        except Exception as e:
+            warnings.warn(f"Can't .flush deferred metrics. {e}", UserWarning)
+            print(e)
+            traceback.print_exc()
+            return
+
+        for metrics, index, timestamp, autoincrement_index in deferred:
+            self._log_metrics(metrics, index, timestamp, autoincrement_index)
+
+    def _log_points(self, points):
+        """
+        Log points (name, index, value, timestamp) of reducers, points with the same index are logged together.
+        """
+        groups = {}
+        for name, index, value, timestamp in points:
+            groups.setdefault((index, timestamp), {})[name] = value
+        for (index, timestamp), metrics in groups.items():
+            self._dispatch('log_metrics', metrics, index, timestamp, True, print_traceback=True, droppable=True)
+
+    def _reduce(self, metrics, index, timestamp):
+        """
+        Pass points of reduced channels through stages of reducers, returns not reduced metrics.
+        """
+        passed = metrics
+        points = []
+        for stage in self._reducers:
+            points = self._reduce_points(stage, points)
+            not_reduced = {}
+            for name, value in passed.items():
+                reduced = self._stage_add(stage, name, value, index, timestamp)
+                if reduced is None:
+                    not_reduced[name] = value
+                else:
+                    points += reduced
+            passed = not_reduced
+        self._log_points(points)
+        return passed
+
+    def _reduce_points(self, stage, points):
+        result = []
+        for name, index, value, timestamp in points:
+            reduced = self._stage_add(stage, name, value, index, timestamp)
+            result += [(name, index, value, timestamp)] if reduced is None else reduced
+        return result
+
+    @staticmethod
+    def _stage_add(stage, name, value, index, timestamp):
+        """stage.add, a bad point (e.g. not numeric value) is dropped with a warning."""
+        try:
+            return stage.add(name, value, index, timestamp)
+        except Exception as e:
+            warnings.warn(f"Can't reduce point of {name}: {value!r}. {e}", UserWarning)
+            return []
+
+    def _flush_reducers(self):
+        points = []
+        for stage in self._reducers:
+            points = self._reduce_points(stage, points) + stage.flush()
+        self._log_points(points)
+
     def stop(self):
-        for tracker in self.trackers:
-            try:
-                tracker.stop()
-            except Exception as e:
-                warnings.warn(f"Can't .stop for tracker {tracker}. {e}", UserWarning)
+        self._flush_deferred()
+        self._flush_reducers()
+        # trackers are stopped even with open circuits, they may write what they have
+        self._dispatch('stop', force=True)
+        if self._workers is not None:
+            for worker in self._workers:
+                worker.stop(self.stop_timeout)
+                if worker.n_dropped:
+                    warnings.warn(f'{worker.n_dropped} calls were dropped for tracker {worker.tracker}.', UserWarning)
+            self._workers = None
+        for tracker, breaker in zip(self.trackers, self._breakers):
+            if breaker is not None and breaker.n_failures:
+                warnings.warn(f'{breaker.n_failures} calls failed, {breaker.n_skipped} calls were skipped '
+                              f'for tracker {tracker}.', UserWarning)
 
     def set_property(self, key, value):
-        for tracker in self.trackers:
-            try:
-                tracker.set_property(key, value)
-            except Exception as e:
-                warnings.warn(f"Can't .set_property for tracker {tracker}. {e}", UserWarning)
+        self._dispatch('set_property', key, value)
 
     def append_tag(self, tag, *tags):
-        for tracker in self.trackers:
-            try:
-                tracker.append_tag(tag, *tags)
-            except Exception as e:
-                warnings.warn(f"Can't .append_tag for tracker {tracker}. {e}", UserWarning)
+        self._dispatch('append_tag', tag, *tags)
+
+    def set_properties(self, properties):
+        self._dispatch('set_properties', dict(properties))
+
+    def append_tags(self, tags):
+        self._dispatch('append_tags', list(tags))
 
     def log_metric(self, name, value, index=None, timestamp=None, autoincrement_index=True):
         if index is None:
             assert autoincrement_index is True, 'Only autoincrement of index is possible for some loggers.'
 
-        for tracker in self.trackers:
+        if self.defer_tensors and (is_tensor(value) or self._deferred_metrics):
+            # queued after deferred metrics to keep order of points
+            self.log_metrics({name: value}, index, timestamp, autoincrement_index)
+            return
+
+        if any([stage.get(name) is not None for stage in self._reducers]):
+            self._reduce({name: value}, index, timestamp)
+            return
+
+        if is_tensor(value):
+            # queued values must not keep a device memory and autograd graphs alive
             try:
-                tracker.log_metric(name, value, index, timestamp, autoincrement_index)
+                value = value.cpu().detach()
             except Exception as e:
-                warnings.warn(f"Can't .log_metric for tracker {tracker}. {e}", UserWarning)
+                warnings.warn(f"Can't .log_metric for tracker. {e}", UserWarning)
                 print(e)
                 traceback.print_exc()
+                return
+
+        if timestamp is None and self._workers is not None:
+            timestamp = time.time()
+
+        self._dispatch('log_metric', name, value, index, timestamp, autoincrement_index, print_traceback=True, droppable=True)
 
     def log_metrics(self, metrics, index=None, timestamp=None, autoincrement_index=True):
-        """Log metrics (numeric values)"""
+        """Log metrics (numeric values), the whole dictionary is passed to each tracker at once."""
+        if index is None:
+            assert autoincrement_index is True, 'Only autoincrement of index is possible for some loggers.'
 
+        # while metrics are deferred, metrics without tensors are queued too to keep order of points
+        if self.defer_tensors and (self._deferred_metrics or any([is_tensor(val) for val in metrics.values()])):
+            if timestamp is None:
+                timestamp = time.time()
+            # detached: queued values must not keep autograd graphs alive
+            metrics = dict([(key, val.detach() if is_tensor(val) else val) for key, val in metrics.items()])
+            self._deferred_metrics.append((metrics, index, timestamp, autoincrement_index))
+            if len(self._deferred_metrics) >= self.defer_tensors_steps:
+                self._flush_deferred()
+            return
+        self._log_metrics(metrics, index, timestamp, autoincrement_index)
+
+    def _log_metrics(self, metrics, index=None, timestamp=None, autoincrement_index=True):
         try:
+            metrics = dict(metrics)
             for key, val in metrics.items():
                 if is_tensor(val):
-                    val = val.cpu().detach()
-                self.log_metric(key, val, index, timestamp=timestamp, autoincrement_index=autoincrement_index)
-
+                    metrics[key] = val.cpu().detach()
         except Exception as e:
             warnings.warn(f"Can't .log_metrics for tracker. {e}", UserWarning)
             print(e)
             traceback.print_exc()
+            return
+
+        if self._reducers:
+            metrics = self._reduce(metrics, index, timestamp)
+            if len(metrics) == 0:
+                return
+
+        if timestamp is None and self._workers is not None:
+            timestamp = time.time()
+
+        self._dispatch('log_metrics', metrics, index, timestamp, autoincrement_index, print_traceback=True, droppable=True)
 
     def log_text(self, name, value, index=None, timestamp=None, autoincrement_index=True):
         if index is None:
             assert autoincrement_index is True, 'Only autoincrement of index is possible for some loggers.'
-        for tracker in self.trackers:
-            try:
-                tracker.log_text(name, value, index, timestamp, autoincrement_index)
-            except Exception as e:
-                warnings.warn(f"Can't .log_text for tracker {tracker}. {e}", UserWarning)
-                print(e)
-                traceback.print_exc()
+
+        # keep order of points and texts
+        self._flush_deferred()
+
+        if timestamp is None and self._workers is not None:
+            timestamp = time.time()
+
+        self._dispatch('log_text', name, value, index, timestamp, autoincrement_index, print_traceback=True, droppable=True)
 
     def log_artifact(self, filename, destination=None):
+        """
+        Trackers that take the file away (SimpleTracker with artifact_strategy='move') get it
+        after the other trackers are done with it, so only one such tracker is possible.
+        """
+        movers = [tracker for tracker in self.trackers if getattr(tracker, 'artifact_strategy', None) == 'move']
+        if not movers:
+            self._dispatch('log_artifact', filename, destination)
+            return
+
+        others = [tracker for tracker in self.trackers if all([tracker is not mover for mover in movers])]
+        self._dispatch('log_artifact', filename, destination, exclude=movers)
+        self.join(others)
+        self._dispatch('log_artifact', filename, destination, exclude=others)
+
+    def log_bytes_artifact(self, data, destination):
+        """Log bytes (or a binary file object) as artifact, trackers consume the buffer without temporary files."""
+        if hasattr(data, 'read'):
+            # a file object can't be shared by trackers
+            data = data.read()
+        self._dispatch('log_bytes_artifact', bytes(data), destination)
+
+    @contextlib.contextmanager
+    def open_artifact(self, destination, mode='wb'):
+        """
+        File object to write artifact `destination`.
+
+        The file is written directly in the directory of the run of the first SimpleTracker,
+        when it's closed the other trackers log it with `.log_artifact` (e.g. queue the upload).
+        Without SimpleTracker the file is temporary, it's removed when all trackers have logged it.
+
+        Example
+        -------
+            with tracker.open_artifact('checkpoints/last.pth') as f:
+                torch.save(state, f)
+        """
+        local = None
         for tracker in self.trackers:
+            if isinstance(tracker, SimpleTracker):
+                local = tracker
+                break
+        if local is None:
+            fd, path = tempfile.mkstemp()
             try:
-                tracker.log_artifact(filename, destination)
-            except Exception as e:
-                warnings.warn(f"Can't .log_artifact for tracker {tracker} {e}", UserWarning)
+                with os.fdopen(fd, mode) as f:
+                    yield f
+            except BaseException:
+                os.remove(path)
+                raise
+            # trackers may log it later in background threads
+            remove = Countdown(len(self.trackers), lambda: os.remove(path))
+            self._dispatch('log_artifact', path, destination, on_done=remove)
+            return
 
-    def log_text_as_artifact(self, text, destination=None, existed_temp_file=None):
-        fd = None
-        try:
-            fd, path = tempfile.mkstemp()
+        with local.open_artifact(destination, mode) as f:
+            yield f
+        self._dispatch('log_artifact', local.artifact_path(destination), destination, exclude=[local])
 
-            with os.fdopen(fd, 'w') as tmp:
-                tmp.write(text)
+    def log_text_as_artifact(self, text, destination=None, existed_temp_file=None):
+        if destination is None:
+            destination = f'text-{uuid.uuid4().hex[:8]}.txt'
+        self.log_bytes_artifact(text.encode('utf-8'), destination)
 
-            for tracker in self.trackers:
-                try:
-                    tracker.log_artifact(path, destination)
-                except Exception as e:
-                    warnings.warn(f"Can't .log_artifact for tracker {tracker}. {e}", UserWarning)
-        except Exception as e:
-            warnings.warn(f"Can't .log_text_as_artifact for composer {self} {e}", UserWarning)
-        finally:
-            if fd is not None:
-                os.remove(path)
+    @property
+    def exp_id(self):
+        for tracker in self.trackers:
+            exp_id = getattr(tracker, 'exp_id', None)
+            if exp_id is not None:
+                return exp_id
 
     @property
     def path(self):
@@ -0,0 +1,232 @@
+import time
+import queue
+import threading
+import traceback
+import warnings
+
+
+QUEUE_FULL_POLICIES = ['block', 'drop_oldest', 'drop_newest']
+
+
+class CircuitBreaker(object):
+    """
+    Skips calls of a failing tracker.
+
+    After `max_failures` failures in `window_s` seconds the circuit is open: calls are skipped
+    for `backoff_s` seconds, then one call probes the tracker. If it succeeds, calls are passed again,
+    otherwise the circuit is open again for twice longer (at most `max_backoff_s`).
+
+    Example
+    -------
+        breaker = CircuitBreaker(max_failures=5, window_s=60)
+        call_tracker(tracker, 'log_metric', ('loss', 0.5), breaker=breaker)
+        breaker.n_failures, breaker.n_skipped
+    """
+
+    def __init__(self, max_failures=5, window_s=60., backoff_s=10., max_backoff_s=600.):
+        self.max_failures = max_failures
+        self.window_s = window_s
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+
+        self.n_failures = 0             # all failures
+        self.n_skipped = 0              # calls skipped while the circuit is open
+        self._failure_times = []        # recent failures while the circuit is closed
+        self._open_until = None
+        self._backoff = backoff_s
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(open={self.is_open}, failures={self.n_failures}, skipped={self.n_skipped})'
+
+    @property
+    def is_open(self):
+        return self._open_until is not None
+
+    def allow(self):
+        """True if the call should be made (the circuit is closed or it's time to probe)."""
+        if self._open_until is None or time.time() >= self._open_until:
+            return True
+        self.n_skipped += 1
+        return False
+
+    def record_success(self):
+        if self._open_until is not None:
+            self._open_until = None
+            self._backoff = self.backoff_s
+        self._failure_times = []
+
+    def record_failure(self):
+        """Returns True if the circuit is opened by this failure (or stays open after a failed probe)."""
+        now = time.time()
+        self.n_failures += 1
+        if self._open_until is not None:
+            # failed probe
+            self._backoff = min(self._backoff * 2, self.max_backoff_s)
+            self._open_until = now + self._backoff
+            return True
+        self._failure_times = [t for t in self._failure_times if now - t < self.window_s] + [now]
+        if len(self._failure_times) >= self.max_failures:
+            self._failure_times = []
+            self._open_until = now + self._backoff
+            return True
+        return False
+
+
+def call_tracker(tracker, method, args=(), kwargs={}, print_traceback=False, breaker=None, force=False):
+    """
+    Call `tracker.method(*args, **kwargs)`, errors are turned into warnings.
+
+    breaker : CircuitBreaker
+        Skip the call if the circuit is open (unless `force`), errors of an open circuit are not reported.
+    """
+    if breaker is not None and not force and not breaker.allow():
+        return
+    try:
+        result = getattr(tracker, method)(*args, **kwargs)
+    except Exception as e:
+        was_open = breaker is not None and breaker.is_open
+        if breaker is not None and breaker.record_failure():
+            if not was_open:
+                warnings.warn(f"Can't .{method} for tracker {tracker}. {e} "
+                              f"Calls are skipped after {breaker.max_failures} failures, see {breaker}.", UserWarning)
+            return
+        warnings.warn(f"Can't .{method} for tracker {tracker}. {e}", UserWarning)
+        if print_traceback:
+            print(e)
+            traceback.print_exc()
+        return
+    if breaker is not None:
+        breaker.record_success()
+    return result
+
+
+class TrackerWorker(object):
+    """
+    Calls methods of a tracker in a background thread.
+
+    Calls are queued in a bounded queue and executed in order.
+    When the queue is full, `full_policy` defines what happens with a new droppable call:
+        'block'       - wait for a free slot,
+        'drop_oldest' - discard the oldest queued droppable call,
+        'drop_newest' - discard the new call.
+    Not droppable calls always wait for a free slot.
+
+    Example
+    -------
+        worker = TrackerWorker(tracker, queue_size=100, full_policy='drop_oldest')
+        worker.submit('log_metric', 'loss', 0.5)
+        worker.stop()       # executes all queued calls and finishes the thread
+    """
+
+    def __init__(self, tracker, queue_size=1000, full_policy='block', breaker=None):
+        assert full_policy in QUEUE_FULL_POLICIES, f'full_policy must be one of {QUEUE_FULL_POLICIES}'
+        self.tracker = tracker
+        self.breaker = breaker
+        self.full_policy = full_policy
+        self.n_dropped = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name=f'{tracker.__class__.__name__}Worker', daemon=True)
+        self._thread.start()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.tracker.__class__.__name__}, queued={self.qsize()}, dropped={self.n_dropped})'
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def submit(self, method, *args, print_traceback=False, on_done=None, droppable=False, force=False, **kwargs):
+        """
+        Queue the call of `tracker.method(*args, **kwargs)`.
+
+        on_done : callable
+            Called without arguments after the call is executed (or dropped).
+        droppable : bool
+            The call may be discarded according to `full_policy` (e.g. points of metrics).
+        force : bool
+            Call even if the circuit of `breaker` is open.
+        """
+        item = (method, args, kwargs, print_traceback, on_done, droppable, force)
+
+        if self.full_policy == 'block' or not droppable:
+            self._queue.put(item)
+            return
+
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                if self.full_policy == 'drop_newest':
+                    self._drop(item)
+                    return
+
+            # drop_oldest
+            if not self._drop_oldest():
+                self._queue.put(item)
+                return
+
+    def _drop_oldest(self):
+        """Discard the oldest droppable call in the queue. Returns False if there is no one."""
+        q = self._queue
+        with q.mutex:
+            for i, queued in enumerate(q.queue):
+                if queued is not None and queued[5]:
+                    del q.queue[i]
+                    q.unfinished_tasks -= 1
+                    q.not_full.notify()
+                    break
+            else:
+                return False
+        self._drop(queued)
+        return True
+
+    def _drop(self, item):
+        self.n_dropped += 1
+        on_done = item[4]
+        if on_done is not None:
+            on_done()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                method, args, kwargs, print_traceback, on_done, droppable, force = item
+                call_tracker(self.tracker, method, args, kwargs, print_traceback, self.breaker, force)
+                if on_done is not None:
+                    on_done()
+            except Exception as e:
+                warnings.warn(f'{self}: {e}', UserWarning)
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        """Wait until all queued calls are executed."""
+        self._queue.join()
+
+    def stop(self, timeout=None):
+        """Execute all queued calls and finish the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            warnings.warn(f'{self} is not finished in {timeout} seconds.', UserWarning)
+
+
+class Countdown(object):
+    """Calls `fn` after it was called `n` times (from any thread)."""
+
+    def __init__(self, n, fn):
+        self._n = n
+        self._fn = fn
+        self._lock = threading.Lock()
+        if n == 0:
+            fn()
+
+    def __call__(self):
+        with self._lock:
+            self._n -= 1
+            done = self._n == 0
+        if done:
+            self._fn()
@@ -0,0 +1,284 @@
+"""
+Append-only storages of metrics of SimpleTracker (journal mode).
+
+Binary format: a file per channel, a header and fixed-width records.
+
+    header:  8 bytes  magic b'CTMETRIC'
+             2 bytes  version (uint16)
+             2 bytes  size of a record (uint16)
+             4 bytes  length of utf-8 encoded name of the channel (uint32)
+             name, padded with zeros to multiple of 64 bytes (alignment for np.memmap)
+    records: int64 index, float64 value, float64 timestamp (little-endian)
+
+The file can be read while it is appended: a partially written last record is ignored.
+
+Texts: json lines in texts.jsonl and a binary index file per channel in texts/ (the same header
+with magic b'CTTEXTIX', records: int64 index, int64 offset of the line in texts.jsonl),
+so the last N texts or a range of indices are read without parsing the whole history.
+"""
+import os
+import re
+import json
+import bisect
+import struct
+from pathlib import Path
+
+
+MAGIC = b'CTMETRIC'
+VERSION = 1
+HEADER = struct.Struct('<8sHHI')
+RECORD = struct.Struct('<qdd')
+HEADER_ALIGN = 64
+RECORD_FIELDS = [('index', '<i8'), ('value', '<f8'), ('timestamp', '<f8')]
+TEXT_MAGIC = b'CTTEXTIX'
+TEXT_RECORD = struct.Struct('<qq')
+
+
+class JsonlJournal(object):
+    """Points as json lines of one file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'a')
+
+    def append(self, records):
+        """records : list of dictionaries (name, index, value, timestamp)"""
+        self._file.write(''.join([json.dumps(record) + '\n' for record in records]))
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def make_header(name, magic=MAGIC, record=RECORD):
+    encoded = name.encode('utf-8')
+    header = HEADER.pack(magic, VERSION, record.size, len(encoded)) + encoded
+    padding = -len(header) % HEADER_ALIGN
+    return header + b'\0' * padding
+
+
+def read_header(fn, magic=MAGIC, record=RECORD):
+    """Returns (name, offset of records)."""
+    with open(fn, 'rb') as f:
+        file_magic, version, record_size, name_length = HEADER.unpack(f.read(HEADER.size))
+        assert file_magic == magic, f'{fn} is not a {magic.decode()} file'
+        assert version == VERSION and record_size == record.size, f'Unsupported version {version} of {fn}'
+        name = f.read(name_length).decode('utf-8')
+    offset = HEADER.size + name_length
+    offset += -offset % HEADER_ALIGN
+    return name, offset
+
+
+class BinaryJournal(object):
+    """
+    Points in binary files with fixed-width records, a file per channel in `directory`.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self._files = {}
+        self._filenames = dict([(name, fn) for name, fn in list_binary_channels(self.directory).items()])
+
+    def _get_file(self, name):
+        if name not in self._files:
+            fn = self._filenames.get(name)
+            if fn is None:
+                safe_name = re.sub(r'[^\w.-]', '_', name)
+                fn = self.directory / f'{len(self._filenames):04d}-{safe_name}.bin'
+                self._filenames[name] = fn
+                with open(fn, 'wb') as f:
+                    f.write(make_header(name))
+            self._files[name] = open(fn, 'ab')
+        return self._files[name]
+
+    def append(self, records):
+        """records : list of dictionaries (name, index, value, timestamp)"""
+        packed = {}
+        for r in records:
+            packed.setdefault(r['name'], []).append(RECORD.pack(r['index'], r['value'], r['timestamp']))
+        for name, chunks in packed.items():
+            self._get_file(name).write(b''.join(chunks))
+
+    def flush(self):
+        for f in self._files.values():
+            f.flush()
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+
+def list_binary_channels(directory, suffix='.bin', magic=MAGIC, record=RECORD):
+    """Dictionary name -> file of binary channels in `directory` (in order of creation)."""
+    channels = {}
+    directory = Path(directory)
+    if not directory.is_dir():
+        return channels
+    for fn in sorted(directory.glob('*' + suffix)):
+        name, _ = read_header(fn, magic, record)
+        channels[name] = fn
+    return channels
+
+
+class TextJournal(object):
+    """
+    Texts as json lines of `path/texts.jsonl` with an index file per channel in `path/texts/`.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.directory = self.path / 'texts'
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.path / 'texts.jsonl', 'ab')
+        self._offset = self._file.tell()
+        self._index_files = {}
+        self._filenames = list_binary_channels(self.directory, '.idx', TEXT_MAGIC, TEXT_RECORD)
+
+    def _get_index_file(self, name):
+        if name not in self._index_files:
+            fn = self._filenames.get(name)
+            if fn is None:
+                safe_name = re.sub(r'[^\w.-]', '_', name)
+                fn = self.directory / f'{len(self._filenames):04d}-{safe_name}.idx'
+                self._filenames[name] = fn
+                with open(fn, 'wb') as f:
+                    f.write(make_header(name, TEXT_MAGIC, TEXT_RECORD))
+            self._index_files[name] = open(fn, 'ab')
+        return self._index_files[name]
+
+    def append(self, records):
+        """records : list of dictionaries (name, index, value, timestamp)"""
+        lines = []
+        entries = {}
+        for r in records:
+            line = (json.dumps(r) + '\n').encode('utf-8')
+            entries.setdefault(r['name'], []).append(TEXT_RECORD.pack(r['index'], self._offset))
+            self._offset += len(line)
+            lines.append(line)
+        # lines are written before their offsets
+        self._file.write(b''.join(lines))
+        self._file.flush()
+        for name, chunks in entries.items():
+            self._get_index_file(name).write(b''.join(chunks))
+
+    def flush(self):
+        self._file.flush()
+        for f in self._index_files.values():
+            f.flush()
+
+    def close(self):
+        self._file.close()
+        for f in self._index_files.values():
+            f.close()
+        self._index_files = {}
+
+
+class _TextIndex(object):
+    """Sequence of indices of an index file of texts, entries are read from disk on access."""
+
+    def __init__(self, fn):
+        _, self._start = read_header(fn, TEXT_MAGIC, TEXT_RECORD)
+        self._file = open(fn, 'rb')
+        self._n = (os.path.getsize(fn) - self._start) // TEXT_RECORD.size
+
+    def __len__(self):
+        return self._n
+
+    def entry(self, i):
+        self._file.seek(self._start + i * TEXT_RECORD.size)
+        return TEXT_RECORD.unpack(self._file.read(TEXT_RECORD.size))
+
+    def __getitem__(self, i):
+        return self.entry(i)[0]
+
+    def close(self):
+        self._file.close()
+
+
+def list_text_channels(path):
+    """Names of text channels of TextJournal in `path`."""
+    return list(list_binary_channels(Path(path) / 'texts', '.idx', TEXT_MAGIC, TEXT_RECORD).keys())
+
+
+def read_texts(path, name, last=None, start=None, stop=None):
+    """
+    Texts of channel `name` logged by TextJournal in `path`: the last `last` ones or with indices
+    in [start, stop). Only the needed lines of texts.jsonl are read.
+
+    Returns list of dictionaries (name, index, value, timestamp).
+    """
+    fn = list_binary_channels(Path(path) / 'texts', '.idx', TEXT_MAGIC, TEXT_RECORD).get(name)
+    if fn is None:
+        return []
+    index = _TextIndex(fn)
+    try:
+        lo = 0 if start is None else bisect.bisect_left(index, start)
+        hi = len(index) if stop is None else bisect.bisect_left(index, stop, lo)
+        if last is not None:
+            lo = max(lo, hi - last)
+        offsets = [index.entry(i)[1] for i in range(lo, hi)]
+    finally:
+        index.close()
+
+    texts = []
+    with open(Path(path) / 'texts.jsonl', 'rb') as f:
+        for offset in offsets:
+            f.seek(offset)
+            try:
+                texts.append(json.loads(f.readline()))
+            except ValueError:
+                # the line of a killed run can be incomplete
+                continue
+    return texts
+
+
+def memmap_binary_channel(fn):
+    """
+    Records of a binary channel file as read-only numpy structured array with fields index, value, timestamp.
+    """
+    import numpy as np
+
+    name, offset = read_header(fn)
+    n = (os.path.getsize(fn) - offset) // RECORD.size
+    if n == 0:
+        return np.zeros(0, dtype=RECORD_FIELDS)
+    return np.memmap(fn, dtype=RECORD_FIELDS, mode='r', offset=offset, shape=(n,))
+
+
+def binary_to_dict(directory):
+    """Dictionary (by name) of lists of dictionary (index, value, timestamp), as metrics.json."""
+    result = {}
+    for name, fn in list_binary_channels(directory).items():
+        records = memmap_binary_channel(fn)
+        result[name] = [{'index': int(r['index']), 'value': float(r['value']), 'timestamp': float(r['timestamp'])} for r in records]
+    return result
+
+
+def binary_to_json(directory, fn):
+    """Convert binary metrics to metrics.json format."""
+    from .utils.fileio import atomic_dump
+    atomic_dump(binary_to_dict(directory), fn)
+
+
+def binary_to_csv(directory, fn, format='wide'):
+    """Convert binary metrics to metrics.csv format ('wide' or 'long', see SimpleTracker.metrics_to_df)."""
+    import pandas as pd
+    from .utils.fileio import atomic_open
+
+    channels = dict([(name, memmap_binary_channel(fn)) for name, fn in list_binary_channels(directory).items()])
+    if format == 'long':
+        frames = [pd.DataFrame({'name': name, 'index': r['index'], 'value': r['value'], 'timestamp': r['timestamp']})
+                  for name, r in channels.items()]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    else:
+        columns = [pd.Series(r['value'], index=r['index'], name=name) for name, r in channels.items()]
+        df = pd.concat(columns, axis=1, join='outer', sort=True) if columns else pd.DataFrame()
+        if columns:
+            df.index.name = 'index'
+            df = df.reset_index()
+    with atomic_open(fn) as f:
+        df.to_csv(f, index=False)
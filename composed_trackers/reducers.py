@@ -0,0 +1,240 @@
+import time
+import random
+import fnmatch
+
+from .utils.registry import Registry, build_from_cfg
+
+
+REDUCERS = Registry('Reducers')
+
+
+class Reducer(object):
+    """
+    Base class of reducers of points of a channel.
+
+    `add` receives every point and returns the list of points (name, index, value, timestamp) to log,
+    `flush` returns the remaining points when logging is finished.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def add(self, index, value, timestamp):
+        raise NotImplementedError
+
+    def flush(self):
+        return []
+
+
+@REDUCERS.register_module
+class EveryNth(Reducer):
+    """Keep every n-th point (the first, n+1-th, ...)."""
+
+    def __init__(self, name, n=10):
+        super().__init__(name)
+        self.n = n
+        self._count = 0
+
+    def add(self, index, value, timestamp):
+        keep = self._count % self.n == 0
+        self._count += 1
+        if keep:
+            return [(self.name, index, value, timestamp)]
+        return []
+
+
+@REDUCERS.register_module
+class Buckets(Reducer):
+    """
+    Aggregate each k points to channels `{name}_{stat}`, stat is one of 'min', 'max', 'mean', 'last'.
+
+    Points are logged at the index and the timestamp of the last point of the bucket.
+    """
+
+    STATS = ['min', 'max', 'mean', 'last']
+
+    def __init__(self, name, k=100, stats=['min', 'max', 'mean']):
+        super().__init__(name)
+        assert all([stat in self.STATS for stat in stats]), f'stats must be in {self.STATS}'
+        self.k = k
+        self.stats = list(stats)
+        self._reset()
+
+    def _reset(self):
+        self._n = 0
+        self._sum = 0.
+        self._min = None
+        self._max = None
+        self._last = None
+
+    def add(self, index, value, timestamp):
+        self._n += 1
+        self._sum += value
+        self._min = value if self._min is None else min(self._min, value)
+        self._max = value if self._max is None else max(self._max, value)
+        self._last = (index, value, timestamp)
+        if self._n >= self.k:
+            return self._emit()
+        return []
+
+    def _emit(self):
+        index, last, timestamp = self._last
+        values = {'min': self._min, 'max': self._max, 'mean': self._sum / self._n, 'last': last}
+        self._reset()
+        return [(f'{self.name}_{stat}', index, values[stat], timestamp) for stat in self.stats]
+
+    def flush(self):
+        # incomplete bucket
+        if self._n == 0:
+            return []
+        return self._emit()
+
+
+@REDUCERS.register_module
+class Reservoir(Reducer):
+    """
+    Uniform random sample of at most `size` points of the whole channel (reservoir sampling).
+
+    Points are logged on `flush`, i.e. when the tracker is stopped.
+    """
+
+    def __init__(self, name, size=1000, seed=None):
+        super().__init__(name)
+        self.size = size
+        self._count = 0
+        self._sample = []
+        self._random = random.Random(seed)
+
+    def add(self, index, value, timestamp):
+        self._count += 1
+        if len(self._sample) < self.size:
+            self._sample.append((self.name, index, value, timestamp))
+        else:
+            j = self._random.randrange(self._count)
+            if j < self.size:
+                self._sample[j] = (self.name, index, value, timestamp)
+        return []
+
+    def flush(self):
+        sample = sorted(self._sample, key=lambda point: point[1])
+        self._sample = []
+        return sample
+
+
+@REDUCERS.register_module
+class RateLimit(Reducer):
+    """
+    At most one point per `min_interval` seconds (or `max_per_second` points per second).
+
+    Points that come earlier are folded into an aggregate ('last', 'mean', 'min', 'max'),
+    which is logged with the first point after the interval is passed (or on flush),
+    at the index and the timestamp of that point. A point after a long pause is logged at once.
+    """
+
+    AGGREGATES = ['last', 'mean', 'min', 'max']
+
+    def __init__(self, name, max_per_second=None, min_interval=None, aggregate='last', clock=time.monotonic):
+        super().__init__(name)
+        assert (max_per_second is None) != (min_interval is None), 'Set one of max_per_second or min_interval'
+        assert aggregate in self.AGGREGATES, f'aggregate must be one of {self.AGGREGATES}'
+        self.min_interval = min_interval if min_interval is not None else 1. / max_per_second
+        self.aggregate = aggregate
+        self.clock = clock
+        self._last_emit_time = None
+        self._reset()
+
+    def _reset(self):
+        self._n = 0
+        self._value = None
+        self._last = None
+
+    def add(self, index, value, timestamp):
+        if self._n == 0 or self.aggregate == 'last':
+            self._value = value
+        elif self.aggregate == 'mean':
+            self._value += value
+        elif self.aggregate == 'min':
+            self._value = min(self._value, value)
+        elif self.aggregate == 'max':
+            self._value = max(self._value, value)
+        self._n += 1
+        self._last = (index, timestamp)
+
+        now = self.clock()
+        if self._last_emit_time is None or now - self._last_emit_time >= self.min_interval:
+            self._last_emit_time = now
+            return self._emit()
+        return []
+
+    def _emit(self):
+        value = self._value / self._n if self.aggregate == 'mean' else self._value
+        index, timestamp = self._last
+        self._reset()
+        return [(self.name, index, value, timestamp)]
+
+    def flush(self):
+        if self._n == 0:
+            return []
+        return self._emit()
+
+
+class ChannelReducers(object):
+    """
+    Reducers of channels selected by glob patterns of names.
+
+    cfg : dict
+        pattern -> config of a reducer, the first matched pattern is used.
+    default_type : str
+        type of reducers without 'type' in config.
+
+    Example
+    -------
+        reducers = ChannelReducers({
+            'train/*': {'type': 'EveryNth', 'n': 10},
+            'loss': {'type': 'Buckets', 'k': 100, 'stats': ['min', 'max', 'mean']},
+            'grad_norm': {'type': 'Reservoir', 'size': 1000},
+        })
+    """
+
+    def __init__(self, cfg, registry=REDUCERS, default_type=None):
+        self.cfg = dict(cfg)
+        if default_type is not None:
+            self.cfg = dict([(pattern, dict({'type': default_type}, **c)) for pattern, c in self.cfg.items()])
+        self.registry = registry
+        self._reducers = {}             # name -> reducer or None
+        self._counts = {}               # name -> number of points (index for autoincrement)
+
+    def __len__(self):
+        return len(self.cfg)
+
+    def get(self, name):
+        if name not in self._reducers:
+            reducer = None
+            for pattern, cfg in self.cfg.items():
+                if fnmatch.fnmatchcase(name, pattern):
+                    reducer = build_from_cfg(cfg, self.registry, {'name': name})
+                    break
+            self._reducers[name] = reducer
+        return self._reducers[name]
+
+    def add(self, name, value, index=None, timestamp=None):
+        """
+        Returns list of points (name, index, value, timestamp) to log or None if the channel is not reduced.
+        """
+        reducer = self.get(name)
+        if reducer is None:
+            return None
+
+        if index is None:
+            index = self._counts.get(name, 0)
+        self._counts[name] = index + 1
+        if timestamp is None:
+            timestamp = time.time()
+        return reducer.add(index, float(value), timestamp)
+
+    def flush(self):
+        points = []
+        for reducer in self._reducers.values():
+            if reducer is not None:
+                points += reducer.flush()
+        return points
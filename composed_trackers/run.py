@@ -0,0 +1,320 @@
+import os
+import re
+import json
+from array import array
+from pathlib import Path
+
+from .utils.fileio import atomic_dump, atomic_open
+from .journal import list_binary_channels, memmap_binary_channel, list_text_channels, read_texts
+from .utils.streams.stdstream import iter_segments
+
+
+COLUMNS = ['index', 'value', 'timestamp']
+
+
+class RunChannel(object):
+    """
+    Channel of a logged run: columns `index`, `value`, `timestamp` as read-only memory-mapped numpy arrays.
+
+    Columns are mapped on first access, pages are read from disk only when they are used.
+    """
+
+    def __init__(self, name, stem):
+        self.name = name
+        self._stem = stem
+        self._columns = {}
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.name!r})'
+
+    def _column(self, column):
+        if column not in self._columns:
+            import numpy as np
+            self._columns[column] = np.load(f'{self._stem}.{column}.npy', mmap_mode='r')
+        return self._columns[column]
+
+    @property
+    def index(self):
+        return self._column('index')
+
+    @property
+    def value(self):
+        return self._column('value')
+
+    @property
+    def timestamp(self):
+        return self._column('timestamp')
+
+    def __len__(self):
+        return len(self.index)
+
+    def to_series(self):
+        import pandas as pd
+        return pd.Series(self.value, index=self.index, name=self.name)
+
+
+class ArrayRunChannel(RunChannel):
+    """
+    Channel with columns in memory (the run directory is read-only, column files can't be written).
+    """
+
+    def __init__(self, name, columns):
+        super().__init__(name, None)
+        self._columns = columns
+
+
+class BinaryRunChannel(RunChannel):
+    """
+    Channel of a run logged with journal_format='binary', the file of the channel is mapped directly.
+    """
+
+    def __init__(self, name, fn):
+        super().__init__(name, None)
+        self._fn = fn
+        self._records = None
+
+    def _column(self, column):
+        if self._records is None:
+            self._records = memmap_binary_channel(self._fn)
+        return self._records[column]
+
+
+class Run(object):
+    """
+    Read-only access to a run logged by SimpleTracker.
+
+    Binary metrics (journal_format='binary') are mapped directly. Other metrics are converted once
+    to numpy column files in `path/channels` (from metrics.jsonl of journal mode or metrics.json),
+    next loads only map them. If the run directory is read-only, the columns are kept in memory.
+
+    Example
+    -------
+        run = Run.load('./logbook/LOG-12')       # or SimpleTracker.open(...)
+        run.params
+        run.channel_names
+        loss = run['loss'].value                 # np.memmap, nothing is read yet
+        loss[-100:].mean()
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.exp_id = self.path.name
+        self._channels = None
+
+    @classmethod
+    def load(cls, path):
+        return cls(path)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({str(self.path)!r})'
+
+    def _load_file(self, filename, default):
+        from mmcv.fileio.io import load
+        fn = self.path / filename
+        if not fn.exists():
+            return default
+        return load(str(fn))
+
+    @property
+    def params(self):
+        return self._load_file('params.yaml', {})
+
+    @property
+    def properties(self):
+        return self._load_file('properties.yaml', {})
+
+    @property
+    def tags(self):
+        return self._load_file('tags.yaml', [])
+
+    @property
+    def channels(self):
+        """Dictionary name -> RunChannel."""
+        if self._channels is None and (self.path / 'metrics').is_dir():
+            self._channels = dict([(name, BinaryRunChannel(name, fn)) for name, fn in list_binary_channels(self.path / 'metrics').items()])
+        if self._channels is None:
+            manifest = self._read_manifest()
+            if manifest is None or manifest['source'] != self._source_signature():
+                manifest = self._build_channels()
+            if manifest is None:
+                return self._channels
+            dir_channels = self.path / 'channels'
+            self._channels = dict([(name, RunChannel(name, dir_channels / stem)) for name, stem in manifest['channels'].items()])
+        return self._channels
+
+    @property
+    def channel_names(self):
+        return list(self.channels.keys())
+
+    def __getitem__(self, name):
+        return self.channels[name]
+
+    def __contains__(self, name):
+        return name in self.channels
+
+    @property
+    def text_channel_names(self):
+        if (self.path / 'texts').is_dir():
+            return list_text_channels(self.path)
+        return list(self._load_file('texts.json', {}).keys())
+
+    def texts(self, name, last=None, start=None, stop=None):
+        """
+        Texts of channel `name` as list of dictionaries (index, value, timestamp):
+        the last `last` ones or with indices in [start, stop).
+
+        Texts of journal mode are read by the index, without parsing all texts.jsonl.
+        """
+        if (self.path / 'texts').is_dir():
+            return [dict([(key, t[key]) for key in COLUMNS]) for t in read_texts(self.path, name, last, start, stop)]
+        texts = [t for t in self._load_file('texts.json', {}).get(name, [])
+                 if (start is None or t['index'] >= start) and (stop is None or t['index'] < stop)]
+        return texts if last is None else texts[max(len(texts) - last, 0):]
+
+    def iter_std(self, name='stdout'):
+        """Lines of captured stdout.txt or stderr.txt, including rotated segments."""
+        return iter_segments(self.path / f'{name}.txt')
+
+    def to_df(self, names=None):
+        """DataFrame with column `index` and a column per channel (materializes channels)."""
+        import pandas as pd
+        if names is None:
+            names = self.channel_names
+        if len(names) == 0:
+            return pd.DataFrame()
+        df = pd.concat([self[name].to_series() for name in names], axis=1, join='outer', sort=True)
+        df.index.name = 'index'
+        return df.reset_index()
+
+    # conversion to column files
+
+    def _source_file(self):
+        for filename in ['metrics.jsonl', 'metrics.json']:
+            fn = self.path / filename
+            if fn.exists():
+                return fn
+
+    def _source_signature(self):
+        fn = self._source_file()
+        if fn is None:
+            return None
+        stat = os.stat(fn)
+        return {'file': fn.name, 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def _read_manifest(self):
+        fn = self.path / 'channels' / 'channels.json'
+        if not fn.exists():
+            return None
+        with open(fn) as f:
+            return json.load(f)
+
+    def _read_source(self):
+        """
+        Dictionary name -> (indices, values, timestamps) arrays.
+        """
+        fn = self._source_file()
+        columns = {}
+
+        def add(name, index, value, timestamp):
+            if name not in columns:
+                columns[name] = (array('q'), array('d'), array('d'))
+            indices, values, timestamps = columns[name]
+            indices.append(index)
+            values.append(value)
+            timestamps.append(timestamp)
+
+        if fn is None:
+            pass
+        elif fn.suffix == '.jsonl':
+            # streaming, one point per line
+            with open(fn) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        r = json.loads(line)
+                    except ValueError:
+                        # the last line of a killed run can be incomplete
+                        continue
+                    add(r['name'], r['index'], r['value'], r['timestamp'])
+        else:
+            with open(fn) as f:
+                metrics = json.load(f)
+            for name, points in metrics.items():
+                for p in points:
+                    add(name, p['index'], p['value'], p['timestamp'])
+        return columns
+
+    def _build_channels(self):
+        """
+        Write column files and the manifest. If it's not possible, sets channels in memory and returns None.
+        """
+        import numpy as np
+
+        signature = self._source_signature()
+        columns = {}
+        for name, (indices, values, timestamps) in self._read_source().items():
+            columns[name] = dict([(column, np.frombuffer(data, dtype=dtype) if len(data) else np.zeros(0, dtype))
+                                  for column, data, dtype in zip(COLUMNS, [indices, values, timestamps], [np.int64, np.float64, np.float64])])
+
+        dir_channels = self.path / 'channels'
+        manifest = {'source': signature, 'channels': {}}
+        try:
+            os.makedirs(dir_channels, exist_ok=True)
+            for i, (name, arrays) in enumerate(columns.items()):
+                safe_name = re.sub(r'[^\w.-]', '_', name)
+                stem = f'{i:04d}-{safe_name}'
+                for column, data in arrays.items():
+                    # atomic: another reader may map the file meanwhile
+                    with atomic_open(dir_channels / f'{stem}.{column}.npy', 'wb') as f:
+                        np.save(f, data)
+                manifest['channels'][name] = stem
+            atomic_dump(manifest, dir_channels / 'channels.json')
+        except OSError:
+            # read-only logbook
+            self._channels = dict([(name, ArrayRunChannel(name, arrays)) for name, arrays in columns.items()])
+            return None
+        return manifest
+
+
+def iter_aligned(runs, name, chunk_size=1000000, start=None, stop=None):
+    """
+    Iterate over channel `name` of several runs aligned by index, by chunks of index range.
+
+    Only the current chunk is read from disk, so runs of any length can be compared.
+
+    Yields (index, values) where `index` is the union of indices of runs in the chunk,
+    `values` is dictionary exp_id -> float array aligned with `index` (NaN where a run has no point).
+
+    Example
+    -------
+        runs = [Run.load(p) for p in Path('./logbook').glob('LOG-*')]
+        for index, values in iter_aligned(runs, 'loss'):
+            ...
+    """
+    import numpy as np
+
+    channels = dict([(run.exp_id, run[name]) for run in runs if name in run])
+    bounds = [(ch.index[0], ch.index[-1]) for ch in channels.values() if len(ch)]
+    if not bounds:
+        return
+    lo = min([b[0] for b in bounds]) if start is None else start
+    hi = max([b[1] for b in bounds]) + 1 if stop is None else stop
+
+    for chunk_start in range(int(lo), int(hi), chunk_size):
+        chunk_stop = min(chunk_start + chunk_size, hi)
+        parts = {}
+        for exp_id, ch in channels.items():
+            # indices of a channel are increasing
+            i0, i1 = np.searchsorted(ch.index, [chunk_start, chunk_stop])
+            parts[exp_id] = (np.asarray(ch.index[i0:i1]), np.asarray(ch.value[i0:i1]))
+
+        index = np.unique(np.concatenate([p[0] for p in parts.values()]))
+        if len(index) == 0:
+            continue
+        values = {}
+        for exp_id, (idx, val) in parts.items():
+            aligned = np.full(len(index), np.nan)
+            aligned[np.searchsorted(index, idx)] = val
+            values[exp_id] = aligned
+        yield index, values
@@ -0,0 +1,338 @@
+import os
+import time
+import socket
+import struct
+import pickle
+import tempfile
+import threading
+import warnings
+from multiprocessing.util import Finalize
+
+from .trackers.base import BaseTracker
+from .dispatch import call_tracker
+
+
+_HEADER = struct.Struct('<I')   # length of the pickled message
+
+
+def _send_message(sock, message):
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exactly(sock, n):
+    chunks = []
+    while n > 0:
+        chunk = sock.recv(min(n, 1 << 20))
+        if not chunk:
+            raise EOFError('Connection closed')
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_message(sock):
+    n, = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return pickle.loads(_recv_exactly(sock, n))
+
+
+class TrackerServer(object):
+    """
+    Owns a tracker (usually ComposedTrackers) and executes calls of `TrackerClient`s
+    received through a Unix domain socket.
+
+    Backends are initialized once in the process of the server, the clients (DataLoader workers,
+    other ranks) are lightweight and only send batches of calls.
+
+    Example
+    -------
+        # main process
+        tracker = ComposedTrackers(**cfg.tracker)
+        server = TrackerServer(tracker)
+        server.start()
+
+        # any process, e.g. a DataLoader worker
+        client = TrackerClient(server.address)
+        client.log_metric('loss', 0.5)
+        client.stop()       # flushes and disconnects, the tracker is not stopped
+
+        # main process
+        server.stop()       # stops the server and the tracker
+
+    Messages are unauthenticated pickles: anyone who can connect to the socket can execute code
+    in the process of the server. Don't put `address` in a shared directory (the default one
+    is a new private temporary directory).
+    """
+
+    def __init__(self, tracker, address=None):
+        self.tracker = tracker
+        if address is None:
+            address = os.path.join(tempfile.mkdtemp(prefix='composed_trackers_'), 'tracker.sock')
+        self.address = str(address)
+
+        self._lock = threading.Lock()      # trackers are not thread safe, calls are executed one by one
+        self._sock = None
+        self._thread = None
+        self._connections = []
+        self._stopped = threading.Event()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.address})'
+
+    def start(self):
+        """Listen and serve in a background thread."""
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(self.address)
+        self._sock.listen()
+        self._thread = threading.Thread(target=self._serve, name='TrackerServer', daemon=True)
+        self._thread.start()
+        return self
+
+    def _serve(self):
+        while not self._stopped.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            thread = threading.Thread(target=self._handle, args=(conn,), name='TrackerServerConnection', daemon=True)
+            self._connections.append((conn, thread))
+            thread.start()
+
+    def _info(self):
+        keys = ['name', 'description', 'exp_id', 'path', 'offline']
+        return dict([(key, getattr(self.tracker, key, None)) for key in keys])
+
+    def _handle(self, conn):
+        try:
+            _send_message(conn, ('info', self._info()))
+            while True:
+                kind, body = _recv_message(conn)
+                if kind == 'calls':
+                    with self._lock:
+                        for method, args, kwargs in body:
+                            call_tracker(self.tracker, method, args, kwargs)
+                elif kind == 'sync':
+                    _send_message(conn, ('ok', None))
+                elif kind == 'close':
+                    break
+        except EOFError:
+            pass
+        except Exception as e:
+            warnings.warn(f'{self}: connection error. {e}', UserWarning)
+        finally:
+            conn.close()
+
+    def stop(self, stop_tracker=True, timeout=None):
+        """
+        Stop accepting connections, wait for connected clients to disconnect and stop the tracker.
+
+        timeout : float
+            Max seconds to wait for each connected client.
+        """
+        self._stopped.set()
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+        if self._thread is not None:
+            self._thread.join()
+        for conn, thread in self._connections:
+            thread.join(timeout)
+            if thread.is_alive():
+                warnings.warn(f'{self}: client is still connected, the connection is closed.', UserWarning)
+                # the handler gets EOF and closes it
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                thread.join(timeout)
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        if stop_tracker:
+            self.tracker.stop()
+
+
+class TrackerClient(BaseTracker):
+    """
+    Tracker that sends calls to `TrackerServer` of another process.
+
+    Calls are buffered and sent in batches: when `batch_size` calls are collected,
+    every `flush_interval_s` seconds (by a background thread), on `.flush()`, on `.stop()`
+    and at exit of the process.
+    A connection is (re)created in each process, so a client can be passed to forked workers
+    (e.g. DataLoader workers, which never call `.stop()`): the rest of calls is sent when a worker
+    of `multiprocessing` exits.
+
+    The socket carries unauthenticated pickles, see `TrackerServer`.
+    """
+
+    def __init__(self, address, batch_size=256, flush_interval_s=1.0, **kwargs):
+        self.address = str(address)
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+
+        self._sock = None
+        self._pid = None
+        self._calls = []
+        self._last_flush_time = time.time()
+        self._info = {}
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+
+        self.initialized = False
+        self.initialize()
+
+    def initialize(self):
+        self._connect()
+        self.initialized = True
+
+    def _connect(self):
+        # locks and threads of the parent are not valid in a forked process
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        if self._sock is not None:
+            # the copy of the connection of the parent, closing it doesn't disconnect the parent
+            self._sock.close()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(self.address)
+        self._pid = os.getpid()
+        self._calls = []
+        kind, self._info = _recv_message(self._sock)
+        # called at exit of the process, also in workers of multiprocessing (they exit by os._exit without atexit)
+        Finalize(self, self._stop_at_exit, exitpriority=10)
+        if self.flush_interval_s is not None:
+            threading.Thread(target=self._run_timer, args=(self._stopped,), name='TrackerClientFlush', daemon=True).start()
+
+    def _run_timer(self, stopped):
+        while not stopped.wait(self.flush_interval_s):
+            try:
+                with self._lock:
+                    if self._calls and self._is_flush_time():
+                        self.flush()
+            except Exception as e:
+                warnings.warn(f'{self.__class__.__name__}: {e}', UserWarning)
+                return
+
+    def __getattr__(self, key):
+        # name, description, exp_id, path, offline of the tracker of the server
+        info = self.__dict__.get('_info', {})
+        if key in info:
+            return info[key]
+        raise AttributeError(key)
+
+    def describe(self):
+        print(self.__class__.__name__)
+        print('   address:', self.address)
+        print('    exp_id:', self.exp_id)
+
+    def _call(self, method, *args, **kwargs):
+        if self._pid != os.getpid():
+            # forked process, the connection of the parent can't be shared
+            self._connect()
+        with self._lock:
+            if self._sock is None:
+                # stopped or the connection is lost
+                return
+            self._calls.append((method, args, kwargs))
+            if len(self._calls) >= self.batch_size or self._is_flush_time():
+                self.flush()
+
+    def _is_flush_time(self):
+        return self.flush_interval_s is not None and time.time() - self._last_flush_time >= self.flush_interval_s
+
+    def flush(self, sync=False):
+        """
+        Send collected calls.
+
+        sync : bool
+            Wait until the server has executed them.
+        """
+        if self._sock is None or self._pid != os.getpid():
+            return
+        with self._lock:
+            if self._sock is None:
+                return
+            calls = self._calls
+            self._calls = []
+            try:
+                if calls:
+                    _send_message(self._sock, ('calls', calls))
+                if sync:
+                    _send_message(self._sock, ('sync', None))
+                    _recv_message(self._sock)
+            except (OSError, EOFError) as e:
+                # the server is gone, logging must not fail the training
+                warnings.warn(f'{self.__class__.__name__}: connection to {self.address} is lost, {len(calls)} calls '
+                              f'and the next ones are dropped. {e}', UserWarning)
+                self._disconnect()
+            self._last_flush_time = time.time()
+
+    def _disconnect(self):
+        self._stopped.set()
+        self._sock.close()
+        self._sock = None
+
+    def stop(self):
+        """Send collected calls and disconnect. The tracker of the server is not stopped."""
+        if self._sock is None or self._pid != os.getpid():
+            return
+        with self._lock:
+            self.flush(sync=True)
+            if self._sock is None:
+                return
+            try:
+                _send_message(self._sock, ('close', None))
+            except OSError:
+                pass
+            self._disconnect()
+
+    def _stop_at_exit(self):
+        try:
+            self.stop()
+        except (OSError, EOFError) as e:
+            warnings.warn(f"{self.__class__.__name__}: can't send calls at exit. {e}", UserWarning)
+
+    def set_property(self, key, value):
+        self._call('set_property', key, value)
+
+    def append_tag(self, tag, *tags):
+        self._call('append_tag', tag, *tags)
+
+    def set_properties(self, properties):
+        self._call('set_properties', dict(properties))
+
+    def append_tags(self, tags):
+        self._call('append_tags', list(tags))
+
+    def log_metric(self, name, value, index=None, timestamp=None, autoincrement_index=True):
+        if timestamp is None:
+            timestamp = time.time()
+        self._call('log_metric', name, float(value), index, timestamp, autoincrement_index)
+
+    def log_metrics(self, metrics, index=None, timestamp=None, autoincrement_index=True):
+        if timestamp is None:
+            timestamp = time.time()
+        metrics = dict([(name, float(value)) for name, value in metrics.items()])
+        self._call('log_metrics', metrics, index, timestamp, autoincrement_index)
+
+    def log_text(self, name, value, index=None, timestamp=None, autoincrement_index=True):
+        if timestamp is None:
+            timestamp = time.time()
+        self._call('log_text', name, value, index, timestamp, autoincrement_index)
+
+    def log_artifact(self, filename, destination=None):
+        # the file is read by the server, so it has to exist until the call is executed
+        self._call('log_artifact', os.path.abspath(str(filename)), destination)
+        self.flush(sync=True)
+
+    def log_bytes_artifact(self, data, destination):
+        if hasattr(data, 'read'):
+            data = data.read()
+        self._call('log_bytes_artifact', bytes(data), destination)
+
+    def log_text_as_artifact(self, text, destination=None, existed_temp_file=None):
+        self._call('log_text_as_artifact', text, destination)
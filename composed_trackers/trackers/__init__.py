@@ -1,7 +1,14 @@
 ""
 from .base import BaseTracker
-from .neptune import NeptuneTracker
 from .simple import SimpleTracker
 
 
 __all__ = ['BaseTracker', 'NeptuneTracker', 'SimpleTracker']
+
+
+def __getattr__(name):
+    # backends with heavy dependencies are imported on first use
+    if name == 'NeptuneTracker':
+        from .neptune import NeptuneTracker
+        return NeptuneTracker
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
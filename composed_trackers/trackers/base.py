@@ -1,5 +1,9 @@
 # from abc import ABC, abstractmethod
 # import warnings
+import os
+import uuid
+import tempfile
+import contextlib
 
 # TODO:
 # abstractmethod politics
@@ -27,17 +31,76 @@ class BaseTracker():
     def append_tag(self, tag, *tags):
         raise NotImplementedError
 
+    def set_properties(self, properties):
+        """Set dictionary of properties {key: value}, trackers can override it to write them at once."""
+        for key, value in properties.items():
+            self.set_property(key, value)
+
+    def append_tags(self, tags):
+        """Append an iterable of tags, trackers can override it to write them at once."""
+        tags = list(tags)
+        if tags:
+            self.append_tag(*tags)
+
+    def flush(self):
+        """Write pending data, trackers with buffering override it."""
+        pass
+
     def log_metric(self, name, value, index=None, timestamp=None, autoincrement_index=True):
         raise NotImplementedError
 
+    def log_metrics(self, metrics, index=None, timestamp=None, autoincrement_index=True):
+        """Log dictionary of metrics {name: value}, trackers can override it to log them at once."""
+        for name, value in metrics.items():
+            self.log_metric(name, value, index, timestamp, autoincrement_index)
+
     def log_text(self, name, value, index=None, timestamp=None, autoincrement_index=True):
         raise NotImplementedError
 
     def log_artifact(self, filename, destination=None):
         raise NotImplementedError
 
+    def log_bytes_artifact(self, data, destination):
+        """
+        Log bytes (or a binary file object) as artifact `destination`.
+
+        Trackers should override it to consume the buffer directly, by default it is written
+        to a temporary file for `.log_artifact`.
+        """
+        if hasattr(data, 'read'):
+            data = data.read()
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            self.log_artifact(path, destination)
+        finally:
+            os.remove(path)
+
+    @contextlib.contextmanager
+    def open_artifact(self, destination, mode='wb'):
+        """
+        File object to write artifact `destination`, the artifact is logged when the file is closed.
+
+        By default the file is temporary and logged with `.log_artifact`.
+
+        Example
+        -------
+            with tracker.open_artifact('checkpoints/last.pth') as f:
+                torch.save(state, f)
+        """
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, mode) as f:
+                yield f
+            self.log_artifact(path, destination)
+        finally:
+            os.remove(path)
+
     def log_text_as_artifact(self, text, destination=None, existed_temp_file=None):
-        raise NotImplementedError
+        if destination is None:
+            destination = f'text-{uuid.uuid4().hex[:8]}.txt'
+        self.log_bytes_artifact(text.encode('utf-8'), destination)
 
     def delete_artifacts(self, path):
         raise NotImplementedError
@@ -0,0 +1,47 @@
+from array import array
+
+
+class Channel(object):
+    """
+    Columnar storage of a channel: growable typed arrays of indices, values and timestamps.
+
+    A point costs 24 bytes for numeric channels instead of a dict with three boxed values.
+    Text channels keep values in a list.
+
+    Example
+    -------
+        channel = Channel()
+        channel.append(0, 0.5, time.time())
+        channel[0]          # {'index': 0, 'value': 0.5, 'timestamp': ...}
+        list(channel)       # list of dictionaries as before
+    """
+
+    def __init__(self, numeric=True):
+        self.numeric = numeric
+        self.indices = array('q')
+        self.values = array('d') if numeric else []
+        self.timestamps = array('d')
+
+    def __len__(self):
+        return len(self.indices)
+
+    def append(self, index, value, timestamp):
+        self.indices.append(index)
+        self.values.append(value)
+        self.timestamps.append(timestamp)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return {'index': self.indices[i], 'value': self.values[i], 'timestamp': self.timestamps[i]}
+
+    def __iter__(self):
+        for index, value, timestamp in zip(self.indices, self.values, self.timestamps):
+            yield {'index': index, 'value': value, 'timestamp': timestamp}
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(numeric={self.numeric}, len={len(self)})'
+
+    def to_list(self):
+        """List of dictionaries (index, value, timestamp)."""
+        return list(self)
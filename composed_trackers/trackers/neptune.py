@@ -1,4 +1,5 @@
 import os
+import time
 # import warnings
 
 import neptune
@@ -6,6 +7,7 @@ from neptune.internal.streams.channel_writer import ChannelWriter
 from neptune.internal.channels.channels import ChannelNamespace
 
 from .base import BaseTracker
+from ..uploader import Uploader
 
 
 class NeptuneTracker(BaseTracker):
@@ -18,6 +20,12 @@ class NeptuneTracker(BaseTracker):
                  exp_id=None,
                  upload_stdout=False,
                  upload_stderr=False,
+                 upload_workers=2,      # Artifacts are uploaded by a pool of threads, see Uploader
+                 upload_queue_size=100,  # .log_artifact blocks when N artifacts are waiting
+                 upload_retries=5,      # Retries of failed uploads with exponential backoff
+                 upload_backoff_s=1.,   # The first delay between retries
+                 upload_timeout_s=None,  # Max seconds .stop() waits for uploads (None - until all are done)
+                 upload_fn=None,        # upload_fn(file_object, destination), default - log_artifact of the experiment
                  **kwargs):
 
         self.name = name
@@ -32,6 +40,14 @@ class NeptuneTracker(BaseTracker):
 
         self.exp_id = exp_id
 
+        self.upload_workers = upload_workers
+        self.upload_queue_size = upload_queue_size
+        self.upload_retries = upload_retries
+        self.upload_backoff_s = upload_backoff_s
+        self.upload_timeout_s = upload_timeout_s
+        self.upload_fn = upload_fn
+        self.uploader = None
+
         kwargs['upload_stdout'] = upload_stdout
         kwargs['upload_stderr'] = upload_stderr
 
@@ -68,6 +84,9 @@ class NeptuneTracker(BaseTracker):
         exp_id = self.internal_handler.id
         if isinstance(exp_id, str):
             self.exp_id = exp_id
+        upload_fn = self.upload_fn if self.upload_fn is not None else self.internal_handler.log_artifact
+        self.uploader = Uploader(upload_fn, self.upload_workers, self.upload_queue_size,
+                                 self.upload_retries, self.upload_backoff_s)
         self.initialized = True
 
     def intercept_std(self):
@@ -75,6 +94,7 @@ class NeptuneTracker(BaseTracker):
 
     def stop(self):
         print('NeptuneTracker stopping... ', end=' ')
+        self.uploader.stop(self.upload_timeout_s)
         self.internal_handler.stop()
         print('Ok.')
 
@@ -84,8 +104,20 @@ class NeptuneTracker(BaseTracker):
         #    self._stderr_stream.close()
 
     def log_artifact(self, artifact_filename, destination=None, local_only=False):
+        # the upload is queued, the file can be removed after the call
+        if not local_only:
+            self.uploader.submit(artifact_filename, destination)
+
+    def log_bytes_artifact(self, data, destination, local_only=False):
+        # uploaded from memory
+        if hasattr(data, 'read'):
+            data = data.read()
         if not local_only:
-            self.internal_handler.log_artifact(artifact_filename, destination)
+            self.uploader.submit_bytes(bytes(data), destination)
+
+    def upload_progress(self):
+        """Queued, uploading, uploaded and failed artifacts, see Uploader.progress."""
+        return self.uploader.progress()
 
     def save_and_log_artifact(self, value, filename='example.txt', local_only=False):
         """
@@ -111,6 +143,13 @@ class NeptuneTracker(BaseTracker):
             y = value
         self.internal_handler.send_metric(name, x, y, timestamp)
 
+    def log_metrics(self, metrics, index=None, timestamp=None, autoincrement_index=True):
+        # one timestamp for all values, the neptune client sends queued values in batches
+        if timestamp is None:
+            timestamp = time.time()
+        for name, value in metrics.items():
+            self.log_metric(name, value, index, timestamp, autoincrement_index)
+
     def log_text(self, name, value, index=None, timestamp=None, autoincrement_index=True):
         if index is None:
             x = value
@@ -1,17 +1,24 @@
 from pathlib import Path
+import io
 import os
-import pandas as pd
+import re
+import hashlib
 import warnings
 import time
-from shutil import copyfile
+import shutil
 import traceback
+import contextlib
 
-from mmcv.fileio.io import dump
-
+from ..utils.fileio import atomic_dump, atomic_open, locked_open, ingest_file
 from ..utils.utils import is_notebook, is_int, is_str, is_float_convertable
-from ..utils.streams.stdstream import StdOutStream, StdErrStream, FileWriter
+from ..utils.streams.stdstream import StdOutStream, StdErrStream, FileWriter, BufferedWriter, RotatingFileWriter
 
 from .base import BaseTracker
+from .channel import Channel
+from ..catalog import Catalog, channel_summary
+from ..blobs import BlobStore
+from ..run import Run
+from ..journal import JsonlJournal, BinaryJournal, TextJournal
 
 
 class SimpleTracker(BaseTracker):
@@ -25,6 +32,22 @@ class SimpleTracker(BaseTracker):
                  properties={},         # Properties of the experiment. They are editable after experiment is created.
                  log_stdout=True,       # Not used when is_notebook==True
                  log_stderr=True,
+                 std_buffer_size=0,     # Keep up to N characters of stdout/stderr in memory and write them in background (0 - write synchronously)
+                 std_flush_interval_s=1.0,  # ... every N seconds, when std_buffer_size is set
+                 std_rotate_bytes=None,  # Start a new segment of stdout.txt/stderr.txt after N bytes, see RotatingFileWriter
+                 std_rotate_interval_s=None,  # ... or after N seconds
+                 std_compress='gzip',   # Compression of closed segments: 'gzip', 'zstd' or None
+                 std_max_segments=None,  # Keep only N newest closed segments (None - all, 0 - none)
+                 journal=False,         # Append metrics to metrics.jsonl (texts to texts.jsonl), write snapshots on .stop() only
+                 journal_format='jsonl',  # 'jsonl' - metrics.jsonl, 'binary' - fixed-width records in metrics/<channel>.bin
+                 csv_format='wide',     # 'wide' - column per channel, 'long' - rows of (name, index, value, timestamp)
+                 flush_every_n=None,    # Write to disk after every N logging calls (every call if no flush_* option is set)
+                 flush_interval_s=None,  # Write to disk if more than N seconds passed since the last flush
+                 flush_on_stop_only=False,  # Write to disk on .stop() or .flush() only
+                 catalog=False,         # Index the experiment in root_path/catalog.sqlite, see Catalog
+                 artifact_strategy='copy',  # How .log_artifact puts files to artifacts/: 'copy', 'move', 'hardlink', ... see ingest_file
+                                            # with 'move' in ComposedTrackers the other trackers get the file first
+                 dedup_artifacts=False,  # Store artifacts once per content in root_path/.blobs, see BlobStore
                  # log_metrics=True,
                  **kwargs):
         self.name = name
@@ -44,12 +67,38 @@ class SimpleTracker(BaseTracker):
         self.properties = properties
         self.log_stdout = log_stdout
         self.log_stderr = log_stderr
+        self.std_buffer_size = std_buffer_size
+        self.std_flush_interval_s = std_flush_interval_s
+        self.std_rotate_bytes = std_rotate_bytes
+        self.std_rotate_interval_s = std_rotate_interval_s
+        self.std_compress = std_compress
+        self.std_max_segments = std_max_segments
+        self.journal = journal
+        assert journal_format in ['jsonl', 'binary'], f'Unknown journal_format {journal_format}'
+        self.journal_format = journal_format
+        self.csv_format = csv_format
+        self.flush_every_n = flush_every_n
+        self.flush_interval_s = flush_interval_s
+        self.flush_on_stop_only = flush_on_stop_only
+        self.artifact_strategy = artifact_strategy
+        self.blobs = None
+        if dedup_artifacts:
+            self.blobs = BlobStore(root_path)
+        self.catalog = None
+        if catalog:
+            self.catalog = Catalog(root_path)
         self._kwargs = kwargs
         self._stdout_stream = None
         self._stderr_stream = None
         # self.log_metrics = log_metrics
         self._metrics = {}
         self._texts = {}
+        self._journal = None
+        self._text_journal = None
+        self._dumped = {}               # filename -> hash of the last written content
+        self._dirty = set()             # what to write on the next .flush()
+        self._n_unflushed = 0
+        self._last_flush_time = time.time()
 
         self.root_path = Path(self.root_path)
 
@@ -61,28 +110,90 @@ class SimpleTracker(BaseTracker):
         print('    exp_id:', self.exp_id)
         print('      path:', self.path)
 
+    @staticmethod
+    def open(path):
+        """
+        Read-only access to a logged run with lazily loaded memory-mapped channels, see `Run`.
+        """
+        return Run.load(path)
+
     def initialize(self, **kwargs):
 
         self.create_id()
-        self.makedir()
+        self.makedir(exist_ok=True)
         # self.intercept_std()
         self._dir_artifacts = self.path / 'artifacts'
         self.dump_params()
         self.dump_properties()
         self.dump_tags()
+        self._update_catalog('add_run', self.exp_id, self.path, self.name, self.description,
+                             self.params, self.properties, list(self.tags))
         self.initialized = True
 
     def create_id(self):
+        """
+        Creates the directory of the experiment.
+
+        The directory is created by `os.mkdir`, which is atomic: if several processes
+        claim the same id, only one of them succeeds.
+        """
+        os.makedirs(self.root_path, exist_ok=True)
         if self.exp_id is not None:
             path = self.root_path / self.exp_id
-            assert not path.exists(), 'Suggested directorty {path} exists.'
+            try:
+                os.mkdir(path)
+            except FileExistsError:
+                raise FileExistsError(f'Suggested directory {path} exists.')
             self.path = path
         else:
             self.path = self.get_next_path()
 
     def get_next_path(self):
         """
-        Finds the next free path in an sequentially named list of files
+        Claims the next free path in an sequentially named list of directories
+
+        e.g. exp_id_template = 'LOG-{i}':
+
+        LOG-1
+        LOG-2
+        LOG-3
+
+        The last claimed number is kept in a counter file under `root_path` and incremented under
+        a file lock, so it runs in O(1) time and concurrently started processes get different ids.
+        Directories created by other means (e.g. with a suggested exp_id) are skipped.
+        """
+        with locked_open(self._counter_path()) as f:
+            content = f.read().strip()
+            if content:
+                i = int(content) + 1
+            else:
+                # new logbook or a logbook created before the counter, find the first free number
+                i = self._find_next_i()
+
+            while True:
+                p = self.get_i_path(i)
+                try:
+                    os.mkdir(p)
+                    break
+                except FileExistsError:
+                    i += 1
+
+            f.seek(0)
+            f.truncate()
+            f.write(str(i))
+
+        self.exp_id = p.name
+        return p
+
+    def _counter_path(self):
+        templ = self.exp_id_template
+        if self.offline:
+            templ = self.exp_id_template_offline
+        return self.root_path / ('.' + re.sub(r'[^\w.-]', '_', templ) + '.counter')
+
+    def _find_next_i(self):
+        """
+        Finds the next free number in an sequentially named list of files
 
         e.g. path_pattern = 'file-%s.txt':
 
@@ -105,9 +216,7 @@ class SimpleTracker(BaseTracker):
             c = (a + b) // 2        # interval midpoint
             a, b = (c, b) if self.get_i_path(c).exists() else (a, c)
 
-        p = self.get_i_path(b)
-        self.exp_id = p.name
-        return p
+        return b
 
     def get_i_path(self, i):
         templ = self.exp_id_template
@@ -122,13 +231,19 @@ class SimpleTracker(BaseTracker):
 
         if not is_notebook():
             if self.log_stdout:
-                fn_log = self.path / 'stdout.txt'
-                filewriter = FileWriter(fn_log)
-                self._stdout_stream = StdOutStream([filewriter])
+                self._stdout_stream = StdOutStream([self._std_writer(self.path / 'stdout.txt')])
             if self.log_stderr:
-                fn_log = self.path / 'stderr.txt'
-                filewriter = FileWriter(fn_log)
-                self._stdout_stream = StdErrStream([filewriter])
+                self._stderr_stream = StdErrStream([self._std_writer(self.path / 'stderr.txt')])
+
+    def _std_writer(self, fn_log):
+        if self.std_rotate_bytes is not None or self.std_rotate_interval_s is not None:
+            filewriter = RotatingFileWriter(fn_log, self.std_rotate_bytes, self.std_rotate_interval_s, self.std_compress,
+                                            self.std_max_segments)
+        else:
+            filewriter = FileWriter(fn_log)
+        if not self.std_buffer_size:
+            return filewriter
+        return BufferedWriter(filewriter, flush_interval_s=self.std_flush_interval_s, max_buffer_size=self.std_buffer_size)
 
     def stop(self):
         print("BaseTracker stopping...", end=' ')
@@ -137,36 +252,134 @@ class SimpleTracker(BaseTracker):
         if self._stderr_stream:
             self._stderr_stream.close()
         self.dump_params()
-        self.dump_properties()
-        self.dump_tags()
-        self.dump_metrics()
+        self._dirty.update(['properties', 'tags', 'metrics'])
+        if self.journal and self._texts:
+            self._dirty.add('texts')
+        self.flush()
+        self.close_journal()
+        summaries = dict([(name, channel_summary(channel.values)) for name, channel in self._metrics.items()])
+        self._update_catalog('set_channels', self.exp_id, summaries, status='stopped')
         print("Ok.")
 
+    def _update_catalog(self, method, *args, **kwargs):
+        if self.catalog is None:
+            return
+        try:
+            getattr(self.catalog, method)(*args, **kwargs)
+        except Exception as e:
+            warnings.warn(f"Can't update catalog {self.catalog}: {e}")
+
     def makedir(self, exist_ok=False):
         os.makedirs(self.path, exist_ok=exist_ok)
 
+    def flush(self):
+        """
+        Write all pending changes to disk.
+        """
+        dirty = self._dirty
+        self._dirty = set()
+        if 'properties' in dirty:
+            self.dump_properties()
+        if 'tags' in dirty:
+            self.dump_tags()
+        if 'metrics' in dirty:
+            self.dump_metrics()
+        if 'texts' in dirty:
+            self.dump_texts()
+        if self._journal is not None:
+            self._journal.flush()
+        if self._text_journal is not None:
+            self._text_journal.flush()
+        self._n_unflushed = 0
+        self._last_flush_time = time.time()
+
+    def _changed(self, *kinds):
+        """
+        Mark `kinds` as pending and flush according to the flush policy.
+        """
+        self._dirty.update(kinds)
+        if self.flush_on_stop_only:
+            return
+
+        self._n_unflushed += 1
+        if self.flush_every_n is None and self.flush_interval_s is None:
+            self.flush()
+        elif self.flush_every_n is not None and self._n_unflushed >= self.flush_every_n:
+            self.flush()
+        elif self.flush_interval_s is not None and time.time() - self._last_flush_time >= self.flush_interval_s:
+            self.flush()
+
     def dump_params(self):
-        dump(self.params, self.path / 'params.yaml')
+        self._dump_if_changed(self.params, 'params.yaml')
 
     def dump_properties(self):
-        dump(self.properties, self.path / 'properties.yaml')
+        self._dump_if_changed(self.properties, 'properties.yaml')
 
     def dump_tags(self):
-        dump(list(self.tags), self.path / 'tags.yaml')
+        self._dump_if_changed(list(self.tags), 'tags.yaml')
+
+    def _dump_if_changed(self, obj, filename):
+        """
+        Write yaml file of the run, unless the content is the same as the last written one.
+        """
+        from mmcv.fileio.io import dump
+
+        buffer = io.StringIO()
+        dump(obj, buffer, file_format='yaml')
+        text = buffer.getvalue()
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        if self._dumped.get(filename) == digest:
+            return
+        with atomic_open(self.path / filename) as f:
+            f.write(text)
+        self._dumped[filename] = digest
 
     def dump_metrics(self):
-        dump(self._metrics, self.path / 'metrics.json')
+        atomic_dump(self._storage_to_dict(self._metrics), self.path / 'metrics.json')
         try:
-            df = self.metrics_to_df()
-            df.to_csv(self.path / 'metrics.csv', index=False)
+            df = self.metrics_to_df(self.csv_format)
+            with atomic_open(self.path / 'metrics.csv') as f:
+                df.to_csv(f, index=False)
         except Exception as e:
             warnings.warn(f"Can't convert and save metrics to DataFrame. {e}")
 
+    def append_to_journal(self, records):
+        """
+        Append metric points (dictionaries with name, index, value, timestamp) to metrics.jsonl
+        or to binary files in metrics/ (see `journal_format`).
+
+        Cost of the call does not depend on the number of points already logged.
+        """
+        if self._journal is None:
+            if self.journal_format == 'binary':
+                self._journal = BinaryJournal(self.path / 'metrics')
+            else:
+                self._journal = JsonlJournal(self.path / 'metrics.jsonl')
+        self._journal.append(records)
+
+    def append_to_text_journal(self, records):
+        """
+        Append texts (dictionaries with name, index, value, timestamp) to texts.jsonl
+        and their offsets to index files of channels, see `TextJournal`.
+        """
+        if self._text_journal is None:
+            self._text_journal = TextJournal(self.path)
+        self._text_journal.append(records)
+
+    def close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self._text_journal is not None:
+            self._text_journal.close()
+            self._text_journal = None
+
     def dump_texts(self):
-        dump(self._texts, self.path / 'texts.json')
+        atomic_dump(self._storage_to_dict(self._texts), self.path / 'texts.json')
         try:
-            df = self.texts_to_df()
-            df.to_csv(self.path / 'texts.csv', index=False)
+            df = self.texts_to_df(self.csv_format)
+            with atomic_open(self.path / 'texts.csv') as f:
+                df.to_csv(f, index=False)
         except Exception as e:
             warnings.warn(f"Can't convert and save texts to DataFrame. {e}")
 
@@ -180,21 +393,52 @@ class SimpleTracker(BaseTracker):
             warnings.warn(f'{artifact_filename} is not a file')
             return
 
-        if not self._dir_artifacts.exists():
-            os.makedirs(self._dir_artifacts, exist_ok=True)
-
-        if destination is None:
-            destination = self._dir_artifacts / artifact_filename.name
+        destination = self._artifact_path(artifact_filename.name if destination is None else destination)
+        if self.blobs is not None:
+            self.blobs.store(artifact_filename, destination, self.artifact_strategy)
         else:
-            destination = Path(destination)
-            target_directory = self._dir_artifacts / destination.parent
-            os.makedirs(target_directory, exist_ok=True)
-            destination = target_directory / destination.name
+            ingest_file(artifact_filename, destination, self.artifact_strategy)
+
+    def log_bytes_artifact(self, data, destination):
+        """Write bytes (or a binary file object) to artifact `destination` at once, without temporary copies."""
+        destination = self._artifact_path(destination)
+        if self.blobs is not None:
+            if hasattr(data, 'read'):
+                data = data.read()
+            self.blobs.link(self.blobs.add_bytes(data), destination)
+            return
+        with atomic_open(destination, 'wb') as f:
+            if hasattr(data, 'read'):
+                shutil.copyfileobj(data, f, 1 << 20)
+            else:
+                f.write(data)
+
+    @contextlib.contextmanager
+    def open_artifact(self, destination, mode='wb'):
+        """
+        File object that writes artifact `destination` directly in the directory of the run.
 
+        The file is moved in place when it's closed, the artifact is never seen partially written.
+        """
+        destination = self._artifact_path(destination)
+        with atomic_open(destination, mode) as f:
+            yield f
+        if self.blobs is not None:
+            self.blobs.store(destination, destination, 'move')
+
+    def artifact_path(self, destination):
+        """Path of artifact `destination` in the directory of the run."""
+        return self._dir_artifacts / destination
+
+    def _artifact_path(self, destination):
+        """Path of the artifact in the directory of the run, creates directories."""
+        destination = Path(destination)
+        target_directory = self._dir_artifacts / destination.parent
+        os.makedirs(target_directory, exist_ok=True)
+        destination = target_directory / destination.name
         if destination.exists():
             warnings.warn(f'destination {destination} is owerwriten.')
-
-        copyfile(artifact_filename, destination)
+        return destination
 
     def save_and_log_artifact(self, value, filename='example.txt', local_only=False):
         """
@@ -211,17 +455,37 @@ class SimpleTracker(BaseTracker):
             f.write(value)
 
     def set_property(self, key, value):
-        self.properties[key] = value
-        self.dump_properties()
+        self.set_properties({key: value})
+
+    def set_properties(self, properties):
+        """
+        Set dictionary of properties with one write, nothing is written if the values are the same.
+        """
+        changed = dict([(key, value) for key, value in properties.items()
+                        if key not in self.properties or self.properties[key] != value])
+        if not changed:
+            return
+        self.properties.update(changed)
+        self._changed('properties')
+        self._update_catalog('set_properties', self.exp_id, changed)
 
     def append_tag(self, tag, *tags):
         if isinstance(tag, list):
             tags_list = tag
         else:
             tags_list = [tag] + list(tags)
+        self.append_tags(tags_list)
 
-        self.tags = self.tags | set(tags_list)
-        self.dump_tags()
+    def append_tags(self, tags):
+        """
+        Append tags with one write, nothing is written if all of them are set already.
+        """
+        new_tags = [tag for tag in dict.fromkeys(tags) if tag not in self.tags]
+        if not new_tags:
+            return
+        self.tags = self.tags | set(new_tags)
+        self._changed('tags')
+        self._update_catalog('add_tags', self.exp_id, new_tags)
 
     def log_metric(self, name, value, index=None, timestamp=None, autoincrement_index=True):
         """
@@ -229,63 +493,114 @@ class SimpleTracker(BaseTracker):
             1) auto incremented
             2) overwritten by index 0.
         """
-        if self.verbose:
-            print('SimpleTracker: send_metric: ', name, value, index, timestamp, autoincrement_index)
-        try:
-            assert is_float_convertable(value)
-            value = float(value)
-            self._log_to_storage(self._metrics, name, value, index, timestamp, autoincrement_index)
-            self.dump_metrics()
+        self.log_metrics({name: value}, index, timestamp, autoincrement_index)
 
-        except Exception as e:
-            warnings.warn(f"Can't log metric '{name}': {e}")
-            print(e)
-            traceback.print_exc()
+    def log_metrics(self, metrics, index=None, timestamp=None, autoincrement_index=True):
+        """
+        Log dictionary of metrics with one write to the journal and one flush check.
+        """
+        records = []
+        for name, value in metrics.items():
+            if self.verbose:
+                print('SimpleTracker: send_metric: ', name, value, index, timestamp, autoincrement_index)
+            try:
+                assert is_float_convertable(value)
+                value = float(value)
+                point = self._log_to_storage(self._metrics, name, value, index, timestamp, autoincrement_index)
+                records.append(dict(name=name, **point))
+
+            except Exception as e:
+                warnings.warn(f"Can't log metric '{name}': {e}")
+                print(e)
+                traceback.print_exc()
+
+        if len(records) == 0:
+            return
+        if self.journal:
+            self.append_to_journal(records)
+            self._changed()
+        else:
+            self._changed('metrics')
 
     def log_text(self, name, value, index=None, timestamp=None, autoincrement_index=True):
         try:
             assert is_str(value)
-            self._log_to_storage(self._texts, name, value, index, timestamp, autoincrement_index)
-            self.dump_texts()
+            point = self._log_to_storage(self._texts, name, value, index, timestamp, autoincrement_index)
+            if self.journal:
+                self.append_to_text_journal([dict(name=name, **point)])
+                self._changed()
+            else:
+                self._changed('texts')
         except Exception as e:
             warnings.warn(f"Can't log text '{name}': {e}")
 
     def _log_to_storage(self, storage, name, value, index=None, timestamp=None, autoincrement_index=True):
         """
-        Simple storage as dictionary (by name) of lists (indexed) of dictionary (index, value, timestamp)
+        Simple storage as dictionary (by name) of channels (columns of index, value, timestamp)
         """
         # Create channel with name if it is not exists
         if name not in storage:
-            storage[name] = []
+            storage[name] = Channel(numeric=isinstance(value, float))
         channel = storage[name]
 
         if index is None:
-            index = len(channel)
+            index = channel.indices[-1] + 1 if len(channel) else 0
 
         assert is_int(index)
         index = int(index)
-        assert (index == len(channel)), f'Index {index} must be equal to {len(channel)}'
+        # indices are increasing, gaps are possible (e.g. downsampled channels)
+        if len(channel):
+            assert (index > channel.indices[-1]), f'Index {index} must be greater than {channel.indices[-1]}'
 
         if timestamp is None:
             timestamp = time.time()
 
-        channel.append({'index': index, 'value': value, 'timestamp': timestamp})
+        channel.append(index, value, timestamp)
+        return {'index': index, 'value': value, 'timestamp': timestamp}
 
-    def metrics_to_df(self):
-        return self._dict_to_df(self._metrics)
+    def _storage_to_dict(self, storage):
+        """
+        Dictionary (by name) of lists of dictionary (index, value, timestamp), as it is saved to json.
+        """
+        return dict([(name, channel.to_list()) for name, channel in storage.items()])
 
-    def texts_to_df(self):
-        return self._dict_to_df(self._texts)
+    def metrics_to_df(self, format='wide'):
+        return self._dict_to_df(self._metrics, format)
 
-    def _dict_to_df(self, items):
-        x = {}
-        for name in items.keys():
-            for d in items[name]:
-                i = d['index']
-                if i not in x:
-                    x[i] = {'index': i}
-                x[i][name] = d['value']
-        df = pd.DataFrame([row for i, row in x.items()])
+    def texts_to_df(self, format='wide'):
+        return self._dict_to_df(self._texts, format)
+
+    def _dict_to_df(self, items, format='wide'):
+        """
+        DataFrame from channels.
+
+        format : str
+            'wide' - column 'index' and column per channel, channels are aligned by index.
+            'long' - columns 'name', 'index', 'value', 'timestamp', no pivot.
+        """
+        import numpy as np
+        import pandas as pd
+
+        assert format in ['wide', 'long'], f'Unknown format {format}'
+        if len(items) == 0:
+            return pd.DataFrame()
+
+        if format == 'long':
+            names = list(items.keys())
+            lengths = [len(items[name]) for name in names]
+            df = pd.DataFrame({
+                'name': np.repeat(np.array(names, dtype=object), lengths),
+                'index': np.concatenate([np.asarray(items[name].indices) for name in names]),
+                'value': np.concatenate([np.asarray(items[name].values, dtype=None if items[name].numeric else object) for name in names]),
+                'timestamp': np.concatenate([np.asarray(items[name].timestamps) for name in names]),
+            })
+            return df
+
+        columns = [pd.Series(channel.values, index=np.asarray(channel.indices), name=name, dtype=None if channel.numeric else object)
+                   for name, channel in items.items()]
+        df = pd.concat(columns, axis=1, join='outer', sort=True)
+        df.index.name = 'index'
+        df = df.reset_index()
         return df
 
     # send_artifact = log_artifact
@@ -0,0 +1,122 @@
+import io
+import os
+import time
+import queue
+import random
+import threading
+import warnings
+
+
+class Uploader(object):
+    """
+    Uploads files by `upload_fn(file_object, destination)` in a pool of background threads.
+
+    A file is opened when it's submitted, so it may be removed or replaced right after `submit`.
+    Failed uploads are retried `max_retries` times with exponential backoff
+    (`backoff_s`, 2 * `backoff_s`, ... at most `max_backoff_s`, with jitter).
+    `submit` blocks when `queue_size` files are waiting.
+
+    Example
+    -------
+        uploader = Uploader(experiment.log_artifact, n_workers=2)
+        uploader.submit('checkpoints/last.pth', 'last.pth')
+        uploader.progress()     # {'queued': 1, 'active': 0, 'done': 0, 'failed': 0, ...}
+        uploader.stop(timeout=600)
+    """
+
+    def __init__(self, upload_fn, n_workers=2, queue_size=100, max_retries=5, backoff_s=1., max_backoff_s=60.):
+        self.upload_fn = upload_fn
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._stats = dict(active=0, done=0, failed=0, retries=0, bytes_queued=0, bytes_done=0)
+        self._stopped = threading.Event()
+        self._threads = [threading.Thread(target=self._run, name=f'Uploader-{i}', daemon=True) for i in range(n_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.progress()})'
+
+    def submit(self, filename, destination=None):
+        if destination is None:
+            destination = os.path.basename(str(filename))
+        f = open(str(filename), 'rb')
+        size = os.fstat(f.fileno()).st_size
+        with self._lock:
+            self._stats['bytes_queued'] += size
+        self._queue.put((f, str(destination), size))
+
+    def submit_bytes(self, data, destination):
+        """Upload bytes from memory."""
+        with self._lock:
+            self._stats['bytes_queued'] += len(data)
+        self._queue.put((io.BytesIO(data), str(destination), len(data)))
+
+    def progress(self):
+        """Numbers of queued, uploading, uploaded and failed files, retries and bytes."""
+        with self._lock:
+            return dict(queued=self._queue.qsize(), **self._stats)
+
+    def _update(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    def _upload(self, f, destination):
+        for attempt in range(self.max_retries + 1):
+            try:
+                f.seek(0)
+                self.upload_fn(f, destination)
+                return True
+            except Exception as e:
+                if attempt == self.max_retries or self._stopped.is_set():
+                    warnings.warn(f"{self.__class__.__name__}: can't upload {destination}. {e}", UserWarning)
+                    return False
+                self._update(retries=1)
+                delay = min(self.backoff_s * 2 ** attempt, self.max_backoff_s)
+                time.sleep(delay * random.uniform(0.5, 1.))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                f, destination, size = item
+                self._update(active=1)
+                with f:
+                    ok = self._upload(f, destination)
+                if ok:
+                    self._update(active=-1, done=1, bytes_done=size)
+                else:
+                    self._update(active=-1, failed=1)
+            finally:
+                self._queue.task_done()
+
+    def join(self, timeout=None):
+        """Wait until all submitted files are uploaded (or failed). Returns False on timeout."""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stop(self, timeout=None):
+        """Wait for uploads at most `timeout` seconds and finish the threads."""
+        if not self.join(timeout):
+            warnings.warn(f'{self} is not finished in {timeout} seconds.', UserWarning)
+            # don't retry anymore, threads are daemons and don't block the exit
+            self._stopped.set()
+            return
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
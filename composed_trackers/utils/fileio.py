@@ -0,0 +1,132 @@
+import os
+import uuid
+import errno
+import shutil
+import contextlib
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode='w'):
+    """
+    Open a temporary file next to `path` and move it over `path` on success.
+
+    Readers never see a partially written file: the rename is atomic on POSIX
+    filesystems, and if the process is killed mid-write the old file is intact.
+
+    Example
+    -------
+        with atomic_open(path / 'metrics.csv') as f:
+            df.to_csv(f, index=False)
+    """
+    path = Path(path)
+    tmp_path = path.parent / f'.{path.name}.{uuid.uuid4().hex[:8]}.tmp'
+    try:
+        with open(str(tmp_path), mode) as f:
+            yield f
+            f.flush()
+        os.replace(str(tmp_path), str(path))
+    except BaseException:
+        if tmp_path.exists():
+            os.remove(str(tmp_path))
+        raise
+
+
+def atomic_dump(obj, path, file_format=None):
+    """Atomic version of mmcv `dump`. Format is guessed by the extension of `path`."""
+    from mmcv.fileio.io import dump
+
+    if file_format is None:
+        file_format = Path(path).suffix.lstrip('.')
+    with atomic_open(path) as f:
+        dump(obj, f, file_format=file_format)
+
+
+FICLONE = 0x40049409    # ioctl of Linux: share extents of files (btrfs, xfs, ...)
+INGEST_STRATEGIES = ['copy', 'move', 'hardlink', 'reflink', 'copy_file_range', 'auto']
+
+
+def _reflink(src, dst):
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, 'reflink is not supported')
+    with open(src, 'rb') as f_src, open(dst, 'wb') as f_dst:
+        fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+
+
+def _copy_file_range(src, dst):
+    if not hasattr(os, 'copy_file_range'):
+        raise OSError(errno.EOPNOTSUPP, 'copy_file_range is not supported')
+    with open(src, 'rb') as f_src, open(dst, 'wb') as f_dst:
+        # the kernel copies the data (server-side on NFS, shared extents on some filesystems)
+        n = os.fstat(f_src.fileno()).st_size
+        while n > 0:
+            copied = os.copy_file_range(f_src.fileno(), f_dst.fileno(), n)
+            if copied == 0:
+                break
+            n -= copied
+
+
+def ingest_file(src, dst, strategy='copy'):
+    """
+    Put file `src` to `dst` (replaced atomically) and return the strategy that was used.
+
+    strategy : str
+        'copy' - plain copy,
+        'move' - rename (copy and remove between filesystems),
+        'hardlink' - the same file under two names (changes of `src` are visible in `dst`),
+        'reflink' - copy-on-write clone, no data is copied (btrfs, xfs, ...),
+        'copy_file_range' - copy in the kernel without passing data to user space,
+        'auto' - 'reflink', 'copy_file_range', 'copy', whichever works first.
+        Strategies fall back to 'copy' when they are not supported.
+    """
+    assert strategy in INGEST_STRATEGIES, f'strategy must be one of {INGEST_STRATEGIES}'
+    src, dst = str(src), str(dst)
+    tmp = os.path.join(os.path.dirname(dst), f'.{os.path.basename(dst)}.{uuid.uuid4().hex[:8]}.tmp')
+
+    candidates = ['reflink', 'copy_file_range'] if strategy == 'auto' else [strategy]
+    functions = {'move': shutil.move, 'hardlink': os.link, 'reflink': _reflink,
+                 'copy_file_range': _copy_file_range, 'copy': shutil.copyfile}
+    try:
+        for used in candidates + ['copy']:
+            try:
+                functions[used](src, tmp)
+                break
+            except OSError:
+                if used == 'copy':
+                    raise
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return used
+
+
+@contextlib.contextmanager
+def locked_open(path):
+    """
+    Open (create if needed) a small file for reading and writing under an exclusive lock.
+
+    Other processes wait in `locked_open` of the same file until the lock is released.
+    Without `fcntl` (Windows) the file is not locked.
+
+    Example
+    -------
+        with locked_open(root_path / '.counter') as f:
+            i = int(f.read() or 0) + 1
+            f.seek(0)
+            f.truncate()
+            f.write(str(i))
+    """
+    f = os.fdopen(os.open(str(path), os.O_RDWR | os.O_CREAT, 0o644), 'r+')
+    with f:
+        if fcntl is not None:
+            fcntl.lockf(f, fcntl.LOCK_EX)
+        yield f
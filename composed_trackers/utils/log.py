@@ -1,4 +1,3 @@
-import numpy as np
 import warnings
 
 
@@ -41,7 +40,17 @@ log_options = {
     'max_shape_length': 14,
 }
 
-scalar_types = (int, np.int, np.int32, np.int64, np.uint, np.uint32, np.uint64)
+
+def get_scalar_types():
+    import numpy as np
+    return (int, np.int32, np.int64, np.uint, np.uint32, np.uint64)
+
+
+def __getattr__(name):
+    # numpy is imported on first use
+    if name == 'scalar_types':
+        return get_scalar_types()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def log(text, array=None, indent=''):
@@ -56,9 +65,10 @@ def log(text, array=None, indent=''):
         log_dict(text, d)
         return
     if array is not None:
+        import numpy as np
         text = indent + text.ljust(log_options['max_name_length'])
         # if scalar
-        if isinstance(array, scalar_types):
+        if isinstance(array, get_scalar_types()):
             text += f"{array}"
         else:
             try:
@@ -88,7 +98,8 @@ def log_as_dict(text, array=None, indent=''):
     r = {}
     r['title'] = indent + text
     if array is not None:
-        if isinstance(array, scalar_types):
+        import numpy as np
+        if isinstance(array, get_scalar_types()):
             r['value'] = array
             r['dtype'] = str(type(array))
         else:
@@ -4,11 +4,13 @@
 
 # Changes
 # - is_str from utils
+# - lazy modules
 
 from .utils import is_str
 
 # import mmcv
 import inspect
+from importlib import import_module
 
 
 class Registry(object):
@@ -16,10 +18,11 @@ class Registry(object):
     def __init__(self, name):
         self._name = name
         self._module_dict = dict()
+        self._lazy_module_dict = dict()
 
     def __repr__(self):
         format_str = self.__class__.__name__ + '(name={}, items={})'.format(
-            self._name, list(self._module_dict.keys()))
+            self._name, list(self._module_dict.keys()) + list(self._lazy_module_dict.keys()))
         return format_str
 
     @property
@@ -31,6 +34,9 @@ class Registry(object):
         return self._module_dict
 
     def get(self, key):
+        if key in self._lazy_module_dict:
+            module = import_module(self._lazy_module_dict.pop(key))
+            self._module_dict[key] = getattr(module, key)
         return self._module_dict.get(key, None)
 
     def _register_module(self, module_class):
@@ -43,7 +49,7 @@ class Registry(object):
             raise TypeError('module must be a class, but got {}'.format(
                 type(module_class)))
         module_name = module_class.__name__
-        if module_name in self._module_dict:
+        if module_name in self._module_dict or module_name in self._lazy_module_dict:
             raise KeyError('{} is already registered in {}'.format(
                 module_name, self.name))
         self._module_dict[module_name] = module_class
@@ -52,6 +58,13 @@ class Registry(object):
         self._register_module(cls)
         return cls
 
+    def register_lazy_module(self, name, module_path):
+        """Register a class `name` of module `module_path`, the module is imported on first `get`."""
+        if name in self._module_dict or name in self._lazy_module_dict:
+            raise KeyError('{} is already registered in {}'.format(
+                name, self.name))
+        self._lazy_module_dict[name] = module_path
+
 
 def build_from_cfg(cfg, registry, default_args=None):
     """Build a module from config dict.
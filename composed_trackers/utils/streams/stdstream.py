@@ -17,7 +17,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import io
+import os
+import re
 import sys
+import gzip
+import time
+import queue
+import atexit
+import shutil
+import threading
+import warnings
 from pathlib import Path
 
 # from neptune.internal.channels.channels import ChannelNamespace
@@ -39,6 +49,263 @@ class FileWriter(object):
         self.f.close()
 
 
+COMPRESSIONS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def _compress_segment(fn, compress):
+    """Compress a closed segment to `fn` + suffix and remove it."""
+    fn_out = fn + COMPRESSIONS[compress]
+    fn_tmp = fn_out + '.tmp'
+    with open(fn, 'rb') as f_in:
+        if compress == 'gzip':
+            with gzip.open(fn_tmp, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out, 1 << 20)
+        else:
+            import zstandard
+            with open(fn_tmp, 'wb') as f_out:
+                zstandard.ZstdCompressor().copy_stream(f_in, f_out)
+    os.replace(fn_tmp, fn_out)
+    os.remove(fn)
+
+
+class RotatingFileWriter(object):
+    """
+    Writer to `path` that moves the file to a numbered segment `path.00001`, `path.00002`, ...
+    when it reaches `max_bytes` or `interval_s` seconds passed, and starts a new file.
+
+    Closed segments are compressed ('gzip' or 'zstd', the latter requires `zstandard`)
+    by a background thread. Only `max_segments` newest segments are kept (None - all, 0 - none).
+    Read them with `iter_segments(path)`.
+    """
+
+    def __init__(self, path, max_bytes=None, interval_s=None, compress='gzip', max_segments=None):
+        assert compress in COMPRESSIONS, f'compress must be one of {list(COMPRESSIONS)}'
+        if compress == 'zstd':
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                warnings.warn('zstandard is not installed, segments are compressed with gzip.', UserWarning)
+                compress = 'gzip'
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.interval_s = interval_s
+        self.compress = compress
+        self.max_segments = max_segments
+
+        # continue numbering of segments of a resumed run
+        segments = _numbered_segments(self.path)
+        self._n_segments = segments[-1][0] if segments else 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._open()
+
+    def _open(self):
+        # append: the current file of a resumed run is continued
+        self.f = open(str(self.path), 'a')
+        self._size = self.f.tell()
+        self._opened_time = time.time()
+
+    def _is_full(self, size):
+        if self.max_bytes is not None and self._size + size > self.max_bytes:
+            return True
+        return self.interval_s is not None and time.time() - self._opened_time >= self.interval_s
+
+    def write(self, v):
+        size = len(v.encode('utf-8'))
+        if self._size and self._is_full(size):
+            self.rotate()
+        self.f.write(v)
+        self._size += size
+
+    def rotate(self):
+        self.f.close()
+        self._n_segments += 1
+        fn = f'{self.path}.{self._n_segments:05d}'
+        os.replace(self.path, fn)
+        self._open()
+        self._queue.put(fn)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='RotatingFileWriter', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            fn = self._queue.get()
+            try:
+                if fn is None:
+                    break
+                if self.compress is not None:
+                    _compress_segment(fn, self.compress)
+                if self.max_segments is not None:
+                    segments = list_segments(self.path)
+                    for old in segments[:max(len(segments) - self.max_segments, 0)]:
+                        os.remove(old)
+            # pylint:disable=bare-except
+            except:
+                pass
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+        if self._thread is not None:
+            # wait for compression of closed segments
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+def _numbered_segments(path):
+    path = Path(path)
+    pattern = re.compile(re.escape(path.name) + r'\.(\d+)(\.gz|\.zst)?$')
+    segments = {}
+    if path.parent.is_dir():
+        for fn in os.listdir(path.parent):
+            m = pattern.match(fn)
+            # both files exist while a segment is compressed, the compressed one is complete
+            if m and (m.group(2) or int(m.group(1)) not in segments):
+                segments[int(m.group(1))] = str(path.parent / fn)
+    return sorted(segments.items())
+
+
+def list_segments(path):
+    """Closed segments of `path` written by RotatingFileWriter, from the oldest."""
+    return [fn for _, fn in _numbered_segments(path)]
+
+
+def _open_segment(fn):
+    if fn.endswith('.gz'):
+        return gzip.open(fn, 'rt')
+    if fn.endswith('.zst'):
+        import zstandard
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(fn, 'rb'), closefd=True))
+    return open(fn)
+
+
+def iter_segments(path):
+    """
+    Lines of segments of `path` and of `path` itself as one stream, decompressing on the fly
+    (a line can be split between segments).
+
+    Example
+    -------
+        for line in iter_segments(run.path / 'stdout.txt'):
+            ...
+    """
+    path = Path(path)
+    fns = list_segments(path)
+    if path.exists():
+        fns.append(str(path))
+    tail = ''
+    for fn in fns:
+        try:
+            f = _open_segment(fn)
+        except FileNotFoundError:
+            # compressed or removed meanwhile
+            compressed = [c for c in list_segments(path) if c.startswith(fn + '.')]
+            if not compressed:
+                continue
+            f = _open_segment(compressed[0])
+        with f:
+            for line in f:
+                if tail:
+                    line = tail + line
+                    tail = ''
+                if line.endswith('\n'):
+                    yield line
+                else:
+                    tail = line
+    if tail:
+        yield tail
+
+
+class BufferedWriter(object):
+    """
+    Wrapper of a writer (e.g. FileWriter) that collects writes in memory and passes them to the writer
+    in blocks from a background thread: when `flush_size` characters are collected
+    or every `flush_interval_s` seconds.
+
+    The buffer never grows over `max_buffer_size` characters: the write that reaches it
+    writes the buffer synchronously. `.flush()` does nothing (progress bars flush after every update),
+    `.flush(force=True)`, `.close()` and exit of the interpreter write everything.
+
+    Example
+    -------
+        stdout_writer = StdOutStream([BufferedWriter(FileWriter(logger.path / 'stdout.txt'))])
+    """
+
+    def __init__(self, writer, flush_size=1 << 16, flush_interval_s=1.0, max_buffer_size=1 << 22):
+        self.writer = writer
+        self.flush_size = min(flush_size, max_buffer_size)
+        self.flush_interval_s = flush_interval_s
+        self.max_buffer_size = max_buffer_size
+
+        self._buffer = []
+        self._size = 0
+        self._lock = threading.Lock()           # buffer
+        self._write_lock = threading.Lock()     # writer, keeps the order of blocks
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='BufferedWriter', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, data):
+        with self._lock:
+            if self._closed:
+                raise ValueError('Write to closed BufferedWriter')
+            self._buffer.append(data)
+            self._size += len(data)
+            size = self._size
+        if size >= self.max_buffer_size:
+            self._write_buffer()
+        elif size >= self.flush_size:
+            self._wakeup.set()
+
+    def _write_buffer(self):
+        with self._write_lock:
+            with self._lock:
+                data = ''.join(self._buffer)
+                self._buffer = []
+                self._size = 0
+            if data:
+                self.writer.write(data)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval_s)
+            self._wakeup.clear()
+            try:
+                self._write_buffer()
+                with self._write_lock:
+                    self.writer.flush()
+            # pylint:disable=bare-except
+            except:
+                pass
+
+    def flush(self, force=False):
+        if not force:
+            # written by the background thread in at most flush_interval_s
+            return
+        self._write_buffer()
+        with self._write_lock:
+            self.writer.flush()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        atexit.unregister(self.close)
+        self._wakeup.set()
+        self._thread.join()
+        self._write_buffer()
+        self.writer.close()
+
+
 class StdStream(object):
     def __init__(self, __std_stream__, writers):
         self._stream = __std_stream__
@@ -79,7 +346,7 @@ class StdStream(object):
         self.flush()
         for w in self._writers:
             try:
-                return w.close()
+                w.close()
             # pylint:disable=bare-except
             except:
                 pass
@@ -0,0 +1,41 @@
+import sys
+import warnings
+
+
+def is_tensor(value):
+    """
+    torch.is_tensor without importing torch: if torch is not imported yet, there are no tensors.
+    """
+    torch = sys.modules.get('torch')
+    return torch is not None and torch.is_tensor(value)
+
+
+def is_scalar_tensor(value):
+    return is_tensor(value) and value.numel() == 1
+
+
+def tensors_to_floats(values):
+    """
+    Convert list of scalar tensors to list of floats.
+
+    Tensors of the same device are stacked and copied to cpu with one transfer,
+    so N values cost one synchronization with a device instead of N.
+    """
+    import torch
+
+    result = [None] * len(values)
+    positions_by_device = {}
+    for i, value in enumerate(values):
+        positions_by_device.setdefault(value.device, []).append(i)
+
+    for device, positions in positions_by_device.items():
+        try:
+            with torch.no_grad():
+                stacked = torch.stack([values[i].detach().reshape(()).to(torch.float64) for i in positions])
+            floats = stacked.cpu().tolist()
+        except Exception as e:
+            warnings.warn(f"Can't stack tensors of {device}: {e}")
+            floats = [float(values[i].detach().cpu()) for i in positions]
+        for i, v in zip(positions, floats):
+            result[i] = v
+    return result
@@ -3,14 +3,12 @@ from __future__ import division
 
 import sys
 import subprocess
-import numpy as np
 import re
 import contextlib
 import six
 import json
 import os
 import os.path
-from IPython.display import display, HTML
 from collections import OrderedDict
 import platform
 
@@ -79,6 +77,7 @@ def is_float_convertable(value):
 
 @contextlib.contextmanager
 def printoptions(*args, **kwargs):
+    import numpy as np
     original = np.get_printoptions()
     np.set_printoptions(*args, **kwargs)
     try:
@@ -88,6 +87,7 @@ def printoptions(*args, **kwargs):
 
 
 def wide_notebook(percents=70):
+    from IPython.display import display, HTML
     display(HTML("<style>.container { width:70% !important; }</style>"))
 
     from .log import log_options
@@ -216,6 +216,7 @@ def df_split_random(df, N, random_seed=None):
     N : int
         Size of first part
     """
+    import numpy as np
     random = np.random.RandomState(random_seed)
 
     all_local_indices = np.arange(len(df))
@@ -70,7 +70,7 @@ setup(
     author_email='proga@goodok.ru',
     url='https://github.com/goodok/composed-trackers',
     packages=find_packages(),
-    python_requires='>=3.6',
+    python_requires='>=3.7',
     install_requires=requirements,
     extras_require=dev_requirements,
 )